@@ -0,0 +1,340 @@
+"""
+benchmarks/video_pipeline.py
+© by hassanpacary
+
+Benchmark of the Reddit video pipeline on synthetic clips served by a local HTTP server
+
+Clips are generated with the FFmpeg lavfi test sources as DASH renditions, audio track and
+manifest laid out like v.redd.it, so `get_video` runs unchanged against them.
+
+Usage, from the root of the project:
+    python -m benchmarks.video_pipeline --durations 15 60 180 --heights 480 720 1080 --limit 10
+"""
+
+# pylint: disable=protected-access
+
+# --- Imports ---
+import argparse
+import asyncio
+import contextlib
+import functools
+import os
+import resource
+import tempfile
+import time
+import uuid
+from unittest import mock
+
+# --- Third party imports ---
+from aiohttp import web
+
+# --- Bot modules ---
+from bot.services.reddit import video_compressor
+from bot.services.reddit.transcode_scheduler import transcode_scheduler, transcode_shutdown
+from bot.utils.aiohttp_client import aiohttp_shutdown
+from bot.utils.disk_cache import DiskCache
+
+
+# Renditions Reddit usually serves, with their average bitrates in bps
+RENDITIONS = {1080: 5_000_000, 720: 2_500_000, 480: 1_200_000, 360: 700_000, 240: 400_000}
+
+MANIFEST = """<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" mediaPresentationDuration="PT{duration}S">
+  <Period>
+    <AdaptationSet contentType="video">
+{representations}
+    </AdaptationSet>
+    <AdaptationSet contentType="audio">
+      <Representation id="audio" mimeType="audio/mp4" bandwidth="128000">
+        <BaseURL>DASH_AUDIO_128.mp4</BaseURL>
+      </Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>
+"""
+
+REPRESENTATION = """      <Representation id="{height}" mimeType="video/mp4" bandwidth="{bitrate}" \
+width="{width}" height="{height}">
+        <BaseURL>DASH_{height}.mp4</BaseURL>
+      </Representation>"""
+
+
+# pylint: disable=line-too-long
+# ███████╗██╗   ██╗███╗   ██╗████████╗██╗  ██╗███████╗████████╗██╗ ██████╗     ██████╗██╗     ██╗██████╗ ███████╗
+# ██╔════╝╚██╗ ██╔╝████╗  ██║╚══██╔══╝██║  ██║██╔════╝╚══██╔══╝██║██╔════╝    ██╔════╝██║     ██║██╔══██╗██╔════╝
+# ███████╗ ╚████╔╝ ██╔██╗ ██║   ██║   ███████║█████╗     ██║   ██║██║         ██║     ██║     ██║██████╔╝███████╗
+# ╚════██║  ╚██╔╝  ██║╚██╗██║   ██║   ██╔══██║██╔══╝     ██║   ██║██║         ██║     ██║     ██║██╔═══╝ ╚════██║
+# ███████║   ██║   ██║ ╚████║   ██║   ██║  ██║███████╗   ██║   ██║╚██████╗    ╚██████╗███████╗██║██║     ███████║
+# ╚══════╝   ╚═╝   ╚═╝  ╚═══╝   ╚═╝   ╚═╝  ╚═╝╚══════╝   ╚═╝   ╚═╝ ╚═════╝     ╚═════╝╚══════╝╚═╝╚═╝     ╚══════╝
+# pylint: enable=line-too-long
+
+
+async def _ffmpeg(*args: str):
+    """Run FFmpeg quietly, raising on failure"""
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-y", "-loglevel", "error", *args,
+        stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+
+    if process.returncode != 0:
+        raise RuntimeError(f"FFmpeg error: {stderr.decode()}")
+
+
+async def make_clip(root: str, duration: int, height: int) -> str:
+    """
+    Generate the DASH renditions, audio track and manifest of a synthetic clip
+
+    Parameters:
+        root (str): Directory served by the local HTTP server
+        duration (int): Clip duration in seconds
+        height (int): Height of the highest rendition
+
+    Returns:
+        str: Id of the clip, its files are in root/<id>/
+    """
+    clip_id = uuid.uuid4().hex[:12]
+    clip_dir = os.path.join(root, clip_id)
+    os.makedirs(clip_dir)
+
+    representations = []
+
+    for rendition_height, bitrate in RENDITIONS.items():
+        if rendition_height > height:
+            continue
+
+        width = rendition_height * 16 // 9 // 2 * 2
+
+        # Temporal noise keeps the encoder from undershooting the bitrate on a static pattern
+        await _ffmpeg(
+            "-f", "lavfi",
+            "-i", f"testsrc2=size={width}x{rendition_height}:rate=30:d={duration}",
+            "-vf", "noise=alls=12:allf=t",
+            "-c:v", "libx264", "-preset", "veryfast", "-b:v", str(bitrate), "-g", "60",
+            "-pix_fmt", "yuv420p", "-an", "-movflags", "+faststart",
+            os.path.join(clip_dir, f"DASH_{rendition_height}.mp4")
+        )
+        representations.append(REPRESENTATION.format(
+            height=rendition_height,
+            width=width,
+            bitrate=bitrate
+        ))
+
+    await _ffmpeg(
+        "-f", "lavfi", "-i", f"sine=frequency=440:d={duration}",
+        "-c:a", "aac", "-b:a", "128k", "-movflags", "+faststart",
+        os.path.join(clip_dir, "DASH_AUDIO_128.mp4")
+    )
+
+    with open(os.path.join(clip_dir, "DASHPlaylist.mpd"), "w", encoding="utf-8") as f:
+        f.write(MANIFEST.format(duration=duration, representations="\n".join(representations)))
+
+    return clip_id
+
+
+async def serve(root: str) -> tuple[web.AppRunner, str]:
+    """
+    Serve a directory over HTTP on a free local port, HEAD and byte ranges included
+
+    Parameters:
+        root (str): Directory to serve
+
+    Returns:
+        tuple[web.AppRunner, str]: The runner to clean up and the base URL
+    """
+    app = web.Application()
+    app.router.add_static("/", root)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+# ███╗   ███╗███████╗ █████╗ ███████╗██╗   ██╗██████╗ ███████╗███████╗
+# ████╗ ████║██╔════╝██╔══██╗██╔════╝██║   ██║██╔══██╗██╔════╝██╔════╝
+# ██╔████╔██║█████╗  ███████║███████╗██║   ██║██████╔╝█████╗  ███████╗
+# ██║╚██╔╝██║██╔══╝  ██╔══██║╚════██║██║   ██║██╔══██╗██╔══╝  ╚════██║
+# ██║ ╚═╝ ██║███████╗██║  ██║███████║╚██████╔╝██║  ██║███████╗███████║
+# ╚═╝     ╚═╝╚══════╝╚═╝  ╚═╝╚══════╝ ╚═════╝ ╚═╝  ╚═╝╚══════╝╚══════╝
+
+
+# A single public method, `lap`, is all the benchmark needs
+class Stopwatch:  # pylint: disable=too-few-public-methods
+    """Wall time and CPU time, of the bot process and of the FFmpeg processes it waited for"""
+
+    def __init__(self):
+        """Start measuring"""
+        self._wall = time.perf_counter()
+        self._cpu = self._cpu_time()
+
+    @staticmethod
+    def _cpu_time() -> float:
+        """CPU seconds used so far by the process and its reaped children"""
+        total = 0.0
+        for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+            usage = resource.getrusage(who)
+            total += usage.ru_utime + usage.ru_stime
+        return total
+
+    def lap(self) -> tuple[float, float]:
+        """Return the wall and CPU seconds since the last lap, and restart"""
+        wall, cpu = time.perf_counter(), self._cpu_time()
+        elapsed = (wall - self._wall, cpu - self._cpu)
+        self._wall, self._cpu = wall, cpu
+        return elapsed
+
+
+def _timed(stage: str, func, timings: dict, running: list):
+    """
+    Wrap a stage function of the pipeline so its calls add up in timings
+
+    Parameters:
+        stage (str): Name of the stage
+        func (Callable): Coroutine function to time
+        timings (dict): Wall and CPU seconds per stage, updated in place
+        running (list): Stages being timed, nested calls are part of the outer one
+
+    Returns:
+        Callable: The timed coroutine function
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if running:
+            return await func(*args, **kwargs)
+
+        running.append(stage)
+        stopwatch = Stopwatch()
+
+        try:
+            return await func(*args, **kwargs)
+
+        finally:
+            running.pop()
+            wall, cpu = stopwatch.lap()
+            previous_wall, previous_cpu = timings.get(stage, (0.0, 0.0))
+            timings[stage] = (previous_wall + wall, previous_cpu + cpu)
+
+    return wrapper
+
+
+# Stage functions of `get_video`, the probe runs twice when a stream copy overshoots the limit
+STAGES = [
+    ("manifest", video_compressor, "_pick_dash_rendition"),
+    ("download", video_compressor, "_download_video_and_audio_source"),
+    ("probe", video_compressor, "_get_transcode_plan"),
+    ("merge", video_compressor, "_run_ffmpeg"),
+    ("compress", video_compressor, "_transcode_parts"),
+    ("compress", transcode_scheduler, "run")
+]
+
+
+async def run_pipeline(url: str, filename: str, limit: int) -> dict:
+    """
+    Run `get_video` with its stage functions wrapped, to time each of them
+
+    Parameters:
+        url (str): URL of the highest rendition of the clip
+        filename (str): Filename of the output
+        limit (int): File size limit in bytes
+
+    Returns:
+        dict: Wall and CPU seconds per stage and in total, output size and number of parts
+    """
+    timings, running = {}, []
+    total = Stopwatch()
+
+    with contextlib.ExitStack() as stack:
+        for stage, owner, name in STAGES:
+            stack.enter_context(mock.patch.object(
+                owner,
+                name,
+                _timed(stage, getattr(owner, name), timings, running)
+            ))
+
+        files = await video_compressor.get_video(url=url, filename=filename, file_size_limit=limit)
+
+    try:
+        sizes = [os.fstat(file.fp.fileno()).st_size for file in files]
+    finally:
+        for file in files:
+            file.close()
+
+    return {
+        "timings": timings,
+        "total": total.lap(),
+        "parts": len(files),
+        "size": max(sizes)
+    }
+
+
+# ██████╗ ███████╗██████╗  ██████╗ ██████╗ ████████╗
+# ██╔══██╗██╔════╝██╔══██╗██╔═══██╗██╔══██╗╚══██╔══╝
+# ██████╔╝█████╗  ██████╔╝██║   ██║██████╔╝   ██║
+# ██╔══██╗██╔══╝  ██╔═══╝ ██║   ██║██╔══██╗   ██║
+# ██║  ██║███████╗██║     ╚██████╔╝██║  ██║   ██║
+# ╚═╝  ╚═╝╚══════╝╚═╝      ╚═════╝ ╚═╝  ╚═╝   ╚═╝
+
+
+def _format_row(clip: str, result: dict, limit: int) -> str:
+    """Format the measures of one clip as a table row"""
+    stages = " ".join(
+        f"{stage}={wall:.2f}s/{cpu:.2f}cpu"
+        for stage, (wall, cpu) in result['timings'].items()
+    )
+    return (
+        f"{clip:<14} {stages:<110} "
+        f"total={result['total'][0]:.2f}s/{result['total'][1]:.2f}cpu "
+        f"out={result['size'] / 1024 / 1024:.2f}MiB ({result['size'] / limit:.0%} of limit) "
+        f"parts={result['parts']}"
+    )
+
+
+async def main(durations: list[int], heights: list[int], limit_mib: int):
+    """Generate the clips, serve them and benchmark every combination"""
+    limit = limit_mib * 1024 * 1024
+
+    with tempfile.TemporaryDirectory() as root:
+        # Outputs must not be served from the bot cache between runs
+        video_cache = DiskCache(
+            name="benchmark_videos",
+            directory=os.path.join(root, "cache"),
+            max_bytes=64 * limit
+        )
+        video_compressor._get_video_cache = lambda: video_cache
+        os.makedirs(os.path.join(root, "clips"))
+        runner, base_url = await serve(os.path.join(root, "clips"))
+
+        try:
+            print(f"Limit {limit_mib} MiB, {transcode_scheduler.workers} transcode workers")
+
+            for duration in durations:
+                for height in heights:
+                    clip_id = await make_clip(os.path.join(root, "clips"), duration, height)
+                    url = f"{base_url}/{clip_id}/DASH_{height}.mp4"
+
+                    result = await run_pipeline(url, f"{clip_id}.mp4", limit)
+                    print(_format_row(f"{duration}s {height}p", result, limit))
+
+        finally:
+            await runner.cleanup()
+            await transcode_shutdown()
+            await aiohttp_shutdown()
+
+
+def run():
+    """Parse the command line and run the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark the Reddit video pipeline")
+    parser.add_argument("--durations", type=int, nargs="+", default=[15, 60, 180])
+    parser.add_argument("--heights", type=int, nargs="+", default=[480, 720, 1080])
+    parser.add_argument("--limit", type=int, default=10, help="File size limit in MiB")
+    args = parser.parse_args()
+
+    asyncio.run(main(durations=args.durations, heights=args.heights, limit_mib=args.limit))
+
+
+if __name__ == "__main__":
+    run()
@@ -19,6 +19,7 @@ from bot.features import context_menus
 from bot.features.tasks import TasksScheduler
 from bot.services.guild.cogs_factory import load_cogs, reload_cogs, unload_cogs
 from bot.services.guild.guild_service import welcome_new_member, goodbye_former_member
+from bot.services.guild.metrics_service import send_metrics
 from bot.services.guild.modal_factory import MessageModal
 from bot.utils.discord_utils import send_response_to_discord
 
@@ -56,6 +57,12 @@ class GuildCog(commands.Cog):
         self.bot.level_db.load_queries("level.sql")
         await self.bot.level_db.execute("create_table_levels")
 
+        # Connect to reddit db
+        await self.bot.reddit_db.connect()
+        self.bot.reddit_db.load_queries("reddit.sql")
+        await self.bot.reddit_db.execute("create_table_watched_listings")
+        await self.bot.reddit_db.execute("create_table_posted_submissions")
+
         # Start background tasks
         scheduler = TasksScheduler(self.bot)
         scheduler.start()
@@ -137,6 +144,29 @@ class GuildCog(commands.Cog):
         await send_response_to_discord(ctx=interaction, content=response, ephemeral=True)
         await load_cogs(ctx=self.bot)
 
+    @app_commands.command(
+        name=COMMANDS['guild']['metrics']['slash_command'],
+        description=COMMANDS['guild']['metrics']['description'],
+    )
+    @app_commands.allowed_contexts(guilds=True)
+    @app_commands.default_permissions(administrator=True)
+    async def metrics_logic(self, interaction: discord.Interaction, host: str = None):
+        """
+        Responds to the /metrics slash command
+
+        Parameters:
+            interaction (discord.Interaction): The interaction object triggered by the user
+            host (str): Only show hosts containing this string (optional)
+
+        Action:
+            - Send a summary of the bot metrics, with the full JSON dump attached
+        """
+        logging.info(
+            "-- %s use /metrics slash command",
+            interaction.user.name
+        )
+        await send_metrics(ctx=interaction, host=host)
+
     @app_commands.command(
         name=COMMANDS['guild']['reload']['slash_command'],
         description=COMMANDS['guild']['reload']['description'],
@@ -15,8 +15,10 @@ from discord.ext import commands
 
 # --- Bot modules ---
 from bot.core.config_loader import COMMANDS, REGEX
-from bot.services.reddit.reddit_service import send_response_with_post_data
-from bot.utils.strings_utils import matches_pattern, regex_search
+from bot.services.reddit.reddit_service import (
+    send_response_with_post_data,
+    send_responses_with_posts_data)
+from bot.utils.strings_utils import regex_findall
 
 
 # ██████╗ ███████╗██████╗ ██████╗ ██╗████████╗    ██╗    ██╗ ██████╗ ██╗   ██╗███████╗
@@ -50,8 +52,8 @@ class RedditCog(commands.Cog):
             message (discord.Message): The message who trigger the listener
 
         Actions:
-            - Checks if the message contains a Reddit URL
-            - If found, extracts the URL and calls `reply_with_medias`
+            - Checks if the message contains Reddit URLs
+            - If found, extracts every URL and replies to each of them, in order
 
         this event responds to the url of a reddit post.
         This response contains an embed with all the post's information,
@@ -62,16 +64,16 @@ class RedditCog(commands.Cog):
         if message.author == self.bot.user:
             return
 
-        pattern = REGEX['reddit']['pattern']
+        # Links are searched anywhere in the message, not only at its start
+        urls = regex_findall(REGEX['reddit']['pattern'], message.content)
 
-        if matches_pattern(pattern, message.content):
+        if urls:
             logging.info(
                 "-- %s said: %s matched with 'reddit url' pattern",
                 message.author,
                 message.content
             )
-            url = regex_search(pattern, message.content)
-            await send_response_with_post_data(ctx=message, url=url)
+            await send_responses_with_posts_data(ctx=message, urls=urls)
 
         await self.bot.process_commands(message)
 
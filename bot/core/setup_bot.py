@@ -37,6 +37,7 @@ class Bot(commands.Bot):
                 setattr(intents, intent_name, enabled)
 
         self.level_db = DatabaseManager("level.db")
+        self.reddit_db = DatabaseManager("reddit.db")
 
         # Initialize bot
         super().__init__(command_prefix="/", intents=intents)
@@ -0,0 +1,37 @@
+-- name: create_table_watched_listings
+CREATE TABLE IF NOT EXISTS watched_listings (
+    listing TEXT PRIMARY KEY,
+    newest TEXT NOT NULL
+                                            );
+
+-- name: create_table_posted_submissions
+CREATE TABLE IF NOT EXISTS posted_submissions (
+    submission TEXT NOT NULL,
+    channel INTEGER NOT NULL,
+    posted_at INTEGER NOT NULL,
+    PRIMARY KEY (submission, channel)
+                                              );
+
+-- name: fetch_newest
+SELECT newest
+FROM watched_listings
+WHERE listing = ?;
+
+-- name: upsert_newest
+INSERT INTO watched_listings (listing, newest)
+VALUES (?, ?)
+ON CONFLICT (listing) DO UPDATE SET newest = excluded.newest;
+
+-- name: fetch_posted
+SELECT submission
+FROM posted_submissions
+WHERE submission = ?
+  AND channel = ?;
+
+-- name: insert_posted
+INSERT OR IGNORE INTO posted_submissions (submission, channel, posted_at)
+VALUES (?, ?, ?);
+
+-- name: prune_posted
+DELETE FROM posted_submissions
+WHERE posted_at < ?;
@@ -13,8 +13,10 @@ from datetime import datetime
 from discord.ext import tasks
 
 # --- bot modules ---
+from bot.core.config_loader import BOT
 from bot.services.guild.activity_component import set_bot_activity
 from bot.services.fun.quote_component import reset_quote
+from bot.services.reddit.subreddit_watcher import SubredditWatcher
 
 
 # ███████╗ ██████╗██╗  ██╗███████╗██████╗ ██╗   ██╗██╗     ███████╗██████╗
@@ -31,11 +33,13 @@ class TasksScheduler:
     def __init__(self, bot):
         """Initialize the tasks with a reference to the bot"""
         self.bot = bot
+        self.subreddit_watcher = SubredditWatcher(bot=bot, db=bot.reddit_db)
 
     def start(self):
         """Start all background tasks"""
         self.swap_activity_task.start()
         self.reset_quote_task.start()
+        self.watch_subreddits_task.start()
 
     #  █████╗  ██████╗████████╗██╗██╗   ██╗██╗████████╗██╗   ██╗
     # ██╔══██╗██╔════╝╚══██╔══╝██║██║   ██║██║╚══██╔══╝╚██╗ ██╔╝
@@ -65,3 +69,20 @@ class TasksScheduler:
         if now.day == 1 and now.hour == 18:
             await reset_quote(ctx=self.bot)
             logging.info("-- Monthly reset of the quote channel")
+
+    # ██████╗ ███████╗██████╗ ██████╗ ██╗████████╗
+    # ██╔══██╗██╔════╝██╔══██╗██╔══██╗██║╚══██╔══╝
+    # ██████╔╝█████╗  ██║  ██║██║  ██║██║   ██║
+    # ██╔══██╗██╔══╝  ██║  ██║██║  ██║██║   ██║
+    # ██║  ██║███████╗██████╔╝██████╔╝██║   ██║
+    # ╚═╝  ╚═╝╚══════╝╚═════╝ ╚═════╝ ╚═╝   ╚═╝
+
+    @tasks.loop(seconds=BOT['reddit']['watcher']['interval'])
+    async def watch_subreddits_task(self):
+        """Background task that posts the new submissions of the watched subreddits"""
+        # An exception would stop the loop for good, a failed poll is retried next time
+        try:
+            await self.subreddit_watcher.poll()
+
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.error("Subreddit watcher poll failed.\n%s", e)
@@ -14,6 +14,9 @@ from bot.core.config_loader import RUN_BANNER, INTERUPT_BANNER
 from bot.core.setup_bot import Bot
 from bot.core.environment import load_env, get_env_var
 from bot.core.setup_logging import setup_logging
+from bot.services.reddit.image_processor import image_processor_shutdown
+from bot.services.reddit.reddit_api_service import reddit_shutdown
+from bot.services.reddit.transcode_scheduler import transcode_shutdown
 from bot.utils.aiohttp_client import aiohttp_shutdown
 
 
@@ -33,6 +36,9 @@ async def run() -> None:
     try:
         await bot.start(get_env_var("DISCORD_TOKEN"))
     finally:
+        await transcode_shutdown()
+        await image_processor_shutdown()
+        await reddit_shutdown()
         await aiohttp_shutdown()
         await bot.close()
 
@@ -0,0 +1,175 @@
+"""
+bot/services/guild/metrics_service.py
+© by hassanpacary
+
+Utility functions for reporting bot runtime metrics to admins
+"""
+
+# --- Imports ---
+import json
+
+# --- Third party imports ---
+import discord
+
+# --- Bot modules ---
+from bot.core.config_loader import STRINGS
+from bot.utils.byte_budget import media_budget
+from bot.utils.discord_utils import send_response_to_discord, create_discord_file
+from bot.utils.disk_cache import DiskCache
+from bot.utils.http_metrics import http_metrics
+from bot.utils.lru_cache import LruCache
+
+
+# ███╗   ███╗███████╗████████╗██████╗ ██╗ ██████╗███████╗
+# ████╗ ████║██╔════╝╚══██╔══╝██╔══██╗██║██╔════╝██╔════╝
+# ██╔████╔██║█████╗     ██║   ██████╔╝██║██║     ███████╗
+# ██║╚██╔╝██║██╔══╝     ██║   ██╔══██╗██║██║     ╚════██║
+# ██║ ╚═╝ ██║███████╗   ██║   ██║  ██║██║╚██████╗███████║
+# ╚═╝     ╚═╝╚══════╝   ╚═╝   ╚═╝  ╚═╝╚═╝ ╚═════╝╚══════╝
+
+
+def _format_seconds(value: float | None) -> str:
+    """Format a latency in seconds as milliseconds, or '-' when unknown"""
+    return "-" if value is None else f"{value * 1000:.0f}ms"
+
+
+def _format_http_summary(snapshot: dict) -> str:
+    """
+    Build a short human-readable summary of the http metrics snapshot
+
+    Parameters:
+        snapshot (dict): Snapshot returned by `http_metrics.snapshot()`
+
+    Returns:
+        str: One line per host and per connection pool
+    """
+    lines = []
+
+    for host, metrics in snapshot['hosts'].items():
+        status = metrics['status']
+        lines.append(
+            f"{host}: {metrics['requests']} req | "
+            f"2xx {status['2xx']} 3xx {status['3xx']} 4xx {status['4xx']} "
+            f"5xx {status['5xx']} err {status['errors']} | "
+            f"ttfb p50 {_format_seconds(metrics['ttfb']['p50'])} "
+            f"p95 {_format_seconds(metrics['ttfb']['p95'])} | "
+            f"total p95 {_format_seconds(metrics['latency']['p95'])} | "
+            f"{metrics['bytes_received'] / (1024 * 1024):.1f} MiB"
+        )
+
+    for pool, metrics in snapshot['pools'].items():
+        lines.append(
+            f"[pool {pool}] limit {metrics['limit']} | in flight {metrics['in_flight']} "
+            f"(peak {metrics['peak_in_flight']}) | queued {metrics['queued_total']} "
+            f"(wait p95 {_format_seconds(metrics['queue_wait']['p95'])})"
+        )
+
+    return "\n".join(lines)
+
+
+def _format_caches_summary(caches: dict) -> str:
+    """
+    Build a short human-readable summary of the caches statistics
+
+    Parameters:
+        caches (dict): Stats of every registered cache, keyed by cache name
+
+    Returns:
+        str: One line per cache
+    """
+    return "\n".join(
+        f"[cache {name}] {stats['size']}/{stats['max_size']} | "
+        f"hits {stats['hits']} misses {stats['misses']} (ratio {stats['hit_ratio']}) | "
+        f"evictions {stats['evictions']} expirations {stats['expirations']}"
+        for name, stats in caches.items()
+    )
+
+
+def _format_disk_caches_summary(disk_caches: dict) -> str:
+    """
+    Build a short human-readable summary of the disk caches statistics
+
+    Parameters:
+        disk_caches (dict): Stats of every registered disk cache, keyed by cache name
+
+    Returns:
+        str: One line per disk cache
+    """
+    return "\n".join(
+        f"[disk {name}] {stats['files']} files, "
+        f"{stats['bytes'] / (1024 * 1024):.0f}/{stats['max_bytes'] / (1024 * 1024):.0f} MiB | "
+        f"hits {stats['hits']} misses {stats['misses']} (ratio {stats['hit_ratio']}) | "
+        f"evictions {stats['evictions']}"
+        for name, stats in disk_caches.items()
+    )
+
+
+def _format_budget_summary(budget: dict) -> str:
+    """
+    Build a short human-readable summary of the media byte budget
+
+    Parameters:
+        budget (dict): Stats returned by `media_budget.stats()`
+
+    Returns:
+        str: One line
+    """
+    return (
+        f"[budget media] {budget['used'] / (1024 * 1024):.1f}/"
+        f"{budget['max_bytes'] / (1024 * 1024):.0f} MiB "
+        f"(peak {budget['peak'] / (1024 * 1024):.1f}) | "
+        f"waiting {budget['waiting']} | waits {budget['waits']} "
+        f"(p95 {_format_seconds(budget['wait_time']['p95'])})"
+    )
+
+
+def collect_metrics(host: str | None = None) -> dict:
+    """
+    Gather every runtime metric of the bot
+
+    Parameters:
+        host (str | None): Only keep http hosts containing this string
+
+    Returns:
+        dict: JSON serializable metrics, by section
+    """
+    return {
+        "http": http_metrics.snapshot(host=host),
+        "caches": {name: cache.stats() for name, cache in sorted(LruCache.registry.items())},
+        "disk_caches": {
+            name: cache.stats() for name, cache in sorted(DiskCache.registry.items())
+        },
+        "media_budget": media_budget.stats()
+    }
+
+
+async def send_metrics(ctx: discord.Interaction, host: str | None = None):
+    """Logic of /metrics command"""
+    responses_dict = STRINGS['guild']['metrics_component']
+    metrics = collect_metrics(host=host)
+
+    if not metrics['http']['hosts'] and not any(
+            stats['hits'] + stats['misses']
+            for stats in [*metrics['caches'].values(), *metrics['disk_caches'].values()]
+    ):
+        await send_response_to_discord(ctx=ctx, content=responses_dict['no_data'], ephemeral=True)
+        return
+
+    # Discord messages are limited to 2000 characters, the full dump is attached as json
+    summary = "\n".join(filter(None, [
+        _format_http_summary(metrics['http']),
+        _format_caches_summary(metrics['caches']),
+        _format_disk_caches_summary(metrics['disk_caches']),
+        _format_budget_summary(metrics['media_budget'])
+    ]))[:1800]
+    content = (
+        responses_dict['summary'].format(uptime=metrics['http']['uptime'])
+        + f"\n```\n{summary}\n```"
+    )
+
+    file = await create_discord_file(
+        filename="metrics.json",
+        data=json.dumps(metrics, indent=2).encode("utf-8")
+    )
+
+    await send_response_to_discord(ctx=ctx, content=content, files=[file], ephemeral=True)
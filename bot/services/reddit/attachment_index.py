@@ -0,0 +1,123 @@
+"""
+bot/services/reddit/attachment_index.py
+© by hassanpacary
+
+Index of the medias already uploaded to Discord, to re-link them instead of uploading them again
+"""
+
+# --- Imports ---
+import hashlib
+import time
+from urllib.parse import urlparse, parse_qs
+
+# --- Third party imports ---
+import discord
+
+# --- Bot modules ---
+from bot.core.config_loader import BOT
+from bot.utils.lru_cache import LruCache
+
+
+# --- Content hash -> CDN URL of an attachment posted by the bot ---
+attachment_cache = LruCache(
+    name="attachments",
+    max_size=BOT['media']['attachment_index']['max_size']
+)
+
+
+# pylint: disable=line-too-long
+#  █████╗ ████████╗████████╗ █████╗  ██████╗██╗  ██╗███╗   ███╗███████╗███╗   ██╗████████╗    ██╗███╗   ██╗██████╗ ███████╗██╗  ██╗
+# ██╔══██╗╚══██╔══╝╚══██╔══╝██╔══██╗██╔════╝██║  ██║████╗ ████║██╔════╝████╗  ██║╚══██╔══╝    ██║████╗  ██║██╔══██╗██╔════╝╚██╗██╔╝
+# ███████║   ██║      ██║   ███████║██║     ███████║██╔████╔██║█████╗  ██╔██╗ ██║   ██║       ██║██╔██╗ ██║██║  ██║█████╗   ╚███╔╝
+# ██╔══██║   ██║      ██║   ██╔══██║██║     ██╔══██║██║╚██╔╝██║██╔══╝  ██║╚██╗██║   ██║       ██║██║╚██╗██║██║  ██║██╔══╝   ██╔██╗
+# ██║  ██║   ██║      ██║   ██║  ██║╚██████╗██║  ██║██║ ╚═╝ ██║███████╗██║ ╚████║   ██║       ██║██║ ╚████║██████╔╝███████╗██╔╝ ██╗
+# ╚═╝  ╚═╝   ╚═╝      ╚═╝   ╚═╝  ╚═╝ ╚═════╝╚═╝  ╚═╝╚═╝     ╚═╝╚══════╝╚═╝  ╚═══╝   ╚═╝       ╚═╝╚═╝  ╚═══╝╚═════╝ ╚══════╝╚═╝  ╚═╝
+# pylint: enable=line-too-long
+
+
+def hash_bytes(data: bytes) -> str:
+    """Compute the content hash of an in-memory media, same digest as `media_probe.hash_file`"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _get_url_ttl(url: str) -> float | None:
+    """
+    Compute how long a Discord CDN URL stays valid
+
+    Signed attachment URLs carry their expiry as a hex unix timestamp in the `ex` parameter
+
+    Parameters:
+        url (str): The attachment URL
+
+    Returns:
+        float | None: Remaining validity in seconds, minus a safety margin, None if unsigned
+    """
+    expires_at = parse_qs(urlparse(url).query).get("ex")
+
+    if not expires_at:
+        return None
+
+    try:
+        remaining = int(expires_at[0], 16) - time.time()
+
+    except ValueError:
+        return 0
+
+    return remaining - BOT['media']['attachment_index']['expiry_margin']
+
+
+def can_relink(ctx: discord.Interaction | discord.Message | discord.TextChannel) -> bool:
+    """
+    Check whether a CDN URL sent as content will be embedded in the target channel
+
+    Parameters:
+        ctx (discord.Message | discord.Interaction | discord.TextChannel):
+            The message or interaction to respond to, or the channel to post in
+
+    Returns:
+        bool: True if the bot can embed links there
+    """
+    if ctx.guild is None:
+        return True
+
+    if isinstance(ctx, discord.Interaction):
+        return ctx.app_permissions.embed_links
+
+    if isinstance(ctx, discord.TextChannel):
+        return ctx.permissions_for(ctx.guild.me).embed_links
+
+    return ctx.channel.permissions_for(ctx.guild.me).embed_links
+
+
+def get_attachment_url(content_hash: str) -> str | None:
+    """
+    Return the CDN URL of a media the bot already uploaded, if it hasn't expired
+
+    Parameters:
+        content_hash (str): Hash of the media content
+
+    Returns:
+        str | None: The attachment URL, or None if unknown or expired
+    """
+    return attachment_cache.get(content_hash)
+
+
+def remember_attachments(message: discord.Message | None, content_hashes: list[str]):
+    """
+    Index the attachments of a sent message by the hash of their content
+
+    Parameters:
+        message (discord.Message | None): The message returned by Discord after the upload
+        content_hashes (list[str]): Hashes of the uploaded files, in upload order
+    """
+    if message is None:
+        return
+
+    for attachment, content_hash in zip(message.attachments, content_hashes):
+        ttl = _get_url_ttl(attachment.url)
+
+        if ttl is None:
+            ttl = BOT['media']['attachment_index']['default_ttl']
+
+        if ttl > 0:
+            attachment_cache.set(content_hash, attachment.url, ttl=ttl)
@@ -0,0 +1,113 @@
+"""
+bot/services/reddit/dash_manifest.py
+© by hassanpacary
+
+Utility functions for reading the renditions of a Reddit video DASH manifest
+"""
+
+# --- Imports ---
+import re
+from urllib.parse import urljoin
+from xml.etree import ElementTree
+
+
+# pylint: disable=line-too-long
+# ██████╗  █████╗ ██████╗ ███████╗███████╗    ███╗   ███╗ █████╗ ███╗   ██╗██╗███████╗███████╗███████╗████████╗
+# ██╔══██╗██╔══██╗██╔══██╗██╔════╝██╔════╝    ████╗ ████║██╔══██╗████╗  ██║██║██╔════╝██╔════╝██╔════╝╚══██╔══╝
+# ██████╔╝███████║██████╔╝███████╗█████╗      ██╔████╔██║███████║██╔██╗ ██║██║█████╗  █████╗  ███████╗   ██║
+# ██╔═══╝ ██╔══██║██╔══██╗╚════██║██╔══╝      ██║╚██╔╝██║██╔══██║██║╚██╗██║██║██╔══╝  ██╔══╝  ╚════██║   ██║
+# ██║     ██║  ██║██║  ██║███████║███████╗    ██║ ╚═╝ ██║██║  ██║██║ ╚████║██║██║     ███████╗███████║   ██║
+# ╚═╝     ╚═╝  ╚═╝╚═╝  ╚═╝╚══════╝╚══════╝    ╚═╝     ╚═╝╚═╝  ╚═╝╚═╝  ╚═══╝╚═╝╚═╝     ╚══════╝╚══════╝   ╚═╝
+# pylint: enable=line-too-long
+
+
+def get_manifest_url(video_url: str) -> str:
+    """
+    Derive the DASH manifest URL from a Reddit video rendition URL
+
+    Parameters:
+        video_url (str): URL of a rendition, e.g. https://v.redd.it/<id>/DASH_720.mp4
+
+    Returns:
+        str: URL of the DASHPlaylist.mpd of the same video
+    """
+    return video_url.split("DASH_")[0] + "DASHPlaylist.mpd"
+
+
+def _parse_duration(value: str | None) -> float | None:
+    """Convert an ISO 8601 duration such as 'PT1M5.2S' to seconds"""
+    match = re.fullmatch(
+        r"PT(?:(\d+(?:\.\d+)?)H)?(?:(\d+(?:\.\d+)?)M)?(?:(\d+(?:\.\d+)?)S)?",
+        value or ""
+    )
+    if not match or not any(match.groups()):
+        return None
+
+    hours, minutes, seconds = (float(group or 0) for group in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def _local_name(tag: str) -> str:
+    """Strip the XML namespace of a tag"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _children(element: ElementTree.Element, name: str) -> list[ElementTree.Element]:
+    """Return the direct children of an element with a given local name"""
+    return [child for child in element if _local_name(child.tag) == name]
+
+
+def parse_dash_manifest(data: bytes, manifest_url: str) -> dict:
+    """
+    Extract the video and audio renditions of a DASH manifest
+
+    Parameters:
+        data (bytes): Raw manifest content
+        manifest_url (str): URL of the manifest, to resolve the relative rendition URLs
+
+    Returns:
+        dict: duration in seconds, video renditions sorted by bandwidth (highest first)
+              and audio renditions sorted the same way. Each rendition has
+              url, bandwidth, width and height
+
+    Raises:
+        ValueError: If the manifest isn't valid XML
+    """
+    try:
+        root = ElementTree.fromstring(data)
+
+    except ElementTree.ParseError as e:
+        raise ValueError(f"Invalid DASH manifest: {manifest_url}") from e
+
+    renditions = {"video": [], "audio": []}
+
+    for period in _children(root, "Period"):
+        for adaptation_set in _children(period, "AdaptationSet"):
+            for representation in _children(adaptation_set, "Representation"):
+                mime_type = (
+                    representation.get("mimeType")
+                    or adaptation_set.get("mimeType")
+                    or adaptation_set.get("contentType")
+                    or ""
+                )
+                kind = mime_type.split("/")[0]
+                base_urls = _children(representation, "BaseURL")
+
+                if kind not in renditions or not base_urls or not base_urls[0].text:
+                    continue
+
+                renditions[kind].append({
+                    "url": urljoin(manifest_url, base_urls[0].text.strip()),
+                    "bandwidth": int(representation.get("bandwidth", 0)),
+                    "width": int(representation.get("width", 0)),
+                    "height": int(representation.get("height", 0))
+                })
+
+    for kind in renditions.values():
+        kind.sort(key=lambda rendition: rendition['bandwidth'], reverse=True)
+
+    return {
+        "duration": _parse_duration(root.get("mediaPresentationDuration")),
+        "video": renditions["video"],
+        "audio": renditions["audio"]
+    }
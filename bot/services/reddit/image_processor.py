@@ -0,0 +1,226 @@
+"""
+bot/services/reddit/image_processor.py
+© by hassanpacary
+
+Utility functions for shrinking images that don't fit Discord upload limits
+"""
+
+# --- Imports ---
+import asyncio
+import functools
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+# --- Third party imports ---
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# --- Bot modules ---
+from bot.core.config_loader import BOT
+from bot.services.reddit.attachment_index import hash_bytes
+from bot.utils.disk_cache import DiskCache
+
+
+# Extensions of the shrunk images, see `_downscale_image_sync`
+OUTPUT_EXTENSIONS = (".jpg", ".webp")
+
+
+# ██████╗  ██████╗ ██╗    ██╗███╗   ██╗███████╗ ██████╗ █████╗ ██╗     ███████╗
+# ██╔══██╗██╔═══██╗██║    ██║████╗  ██║██╔════╝██╔════╝██╔══██╗██║     ██╔════╝
+# ██║  ██║██║   ██║██║ █╗ ██║██╔██╗ ██║███████╗██║     ███████║██║     █████╗
+# ██║  ██║██║   ██║██║███╗██║██║╚██╗██║╚════██║██║     ██╔══██║██║     ██╔══╝
+# ██████╔╝╚██████╔╝╚███╔███╔╝██║ ╚████║███████║╚██████╗██║  ██║███████╗███████╗
+# ╚═════╝  ╚═════╝  ╚══╝╚══╝ ╚═╝  ╚═══╝╚══════╝ ╚═════╝╚═╝  ╚═╝╚══════╝╚══════╝
+
+
+def _encode_image(image: Image.Image, image_format: str, quality: int) -> bytes:
+    """Encode an image in memory with the settings of its output format"""
+    buffer = io.BytesIO()
+
+    if image_format == "WEBP":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    else:
+        image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+
+    return buffer.getvalue()
+
+
+def _downscale_image_sync(data: bytes, max_size: int, quality: int) -> tuple[bytes, str] | None:
+    """
+    Re-encodes an image, lowering the resolution until it fits max_size
+
+    Images with transparency are encoded as WebP to keep it, the others as JPEG.
+    The EXIF orientation is applied to the pixels since re-encoding drops the metadata
+
+    Parameters:
+        data (bytes): Raw image data
+        max_size (int): Maximum size of the output in bytes
+        quality (int): Encoder quality, from 1 to 100
+
+    Returns:
+        tuple[bytes, str] | None: Encoded data under max_size and its file extension,
+                                  or None if the image can't be shrunk
+    """
+    try:
+        image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+        has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    # A corrupt download or a decompression bomb only drops this image
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        logging.error("Failed to open image for downscaling.\n%s", e)
+        return None
+
+    image_format, extension = ("WEBP", ".webp") if has_alpha else ("JPEG", ".jpg")
+    scale = 1.0
+
+    # The first pass only re-encodes, most oversized images are lossless PNGs
+    for _ in range(8):
+        width, height = int(image.width * scale), int(image.height * scale)
+        if width < 16 or height < 16:
+            break
+
+        resized = image if scale == 1.0 else image.resize(
+            (width, height),
+            Image.Resampling.LANCZOS
+        )
+        encoded = _encode_image(resized, image_format, quality)
+
+        if len(encoded) <= max_size:
+            return encoded, extension
+
+        # Bytes grow roughly with the pixel count, aim a bit under the limit
+        scale *= min(0.9, (max_size / len(encoded)) ** 0.5 * 0.95)
+
+    return None
+
+
+def _is_animated_gif_sync(data: bytes) -> bool:
+    """Check whether raw image data is a GIF with more than one frame"""
+    if not data.startswith((b"GIF87a", b"GIF89a")):
+        return False
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return getattr(image, "is_animated", False)
+
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        return False
+
+
+async def is_animated_gif(data: bytes) -> bool:
+    """
+    Check whether an image is an animated GIF, without blocking the event loop
+
+    Parameters:
+        data (bytes): Raw image data
+
+    Returns:
+        bool: True if the image is a GIF with more than one frame
+    """
+    if not data.startswith((b"GIF87a", b"GIF89a")):
+        return False
+
+    return await asyncio.to_thread(_is_animated_gif_sync, data)
+
+
+# Encoding is CPU bound and holds the GIL, it runs in worker processes created on first use
+@functools.cache
+def _get_executor() -> ProcessPoolExecutor:
+    """Return the image worker processes, created on first use"""
+    return ProcessPoolExecutor(max_workers=BOT['media']['image_processing']['workers'])
+
+
+def _reset_executor():
+    """Stop the image worker processes, dropping the pending encodes, the next use restarts them"""
+    if _get_executor.cache_info().currsize:
+        _get_executor().shutdown(wait=False, cancel_futures=True)
+        _get_executor.cache_clear()
+
+
+# --- Shrunk images, keyed by content hash and size budget, re-posts skip the encode ---
+# On disk, images of up to the upload limit would take hundreds of MB in memory
+@functools.cache
+def _get_image_cache() -> DiskCache:
+    """Return the cache of shrunk images, its directory is indexed on first use"""
+    return DiskCache(
+        name="processed_images",
+        directory=BOT['media']['image_processing']['cache']['directory'],
+        max_bytes=BOT['media']['image_processing']['cache']['max_bytes']
+    )
+
+
+def _get_cached_image(content_hash: str, max_size: int) -> str | None:
+    """Return the path of an image already shrunk for this size budget, whatever its format"""
+    for extension in OUTPUT_EXTENSIONS:
+        key = DiskCache.make_key(content_hash, max_size, extension)
+        if key in _get_image_cache():
+            return _get_image_cache().get(key)
+
+    return None
+
+
+async def _cache_image(content_hash: str, max_size: int, data: bytes, extension: str):
+    """Store a shrunk image in the disk cache"""
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmpdir:
+        path = os.path.join(tmpdir, "image" + extension)
+        await asyncio.to_thread(Path(path).write_bytes, data)
+        await _get_image_cache().put(DiskCache.make_key(content_hash, max_size, extension), path)
+
+
+async def downscale_image(data: bytes, filename: str, max_size: int) -> tuple[bytes, str] | None:
+    """
+    Shrinks an image so it fits max_size in a worker process, without blocking the event loop
+
+    Parameters:
+        data (bytes): Raw image data
+        filename (str): Original filename, its extension is replaced by the output format one
+        max_size (int): Maximum size of the output in bytes
+
+    Returns:
+        tuple[bytes, str] | None: The shrunk image and its new filename, or None on failure
+    """
+    content_hash = hash_bytes(data)
+    cached_path = _get_cached_image(content_hash, max_size)
+
+    if cached_path is not None:
+        logging.info("-- Image %s served shrunk from cache", filename)
+        cached = await asyncio.to_thread(Path(cached_path).read_bytes)
+        return cached, Path(filename).stem + Path(cached_path).suffix
+
+    try:
+        shrunk = await asyncio.get_running_loop().run_in_executor(
+            _get_executor(),
+            _downscale_image_sync,
+            data,
+            max_size,
+            BOT['media']['image_processing']['quality']
+        )
+
+    # A crashed worker breaks the whole pool, it's replaced for the next images
+    except BrokenProcessPool as e:
+        logging.error("Image worker crashed while downscaling %s.\n%s", filename, e)
+        _reset_executor()
+        return None
+
+    if shrunk is None:
+        return None
+
+    await _cache_image(content_hash, max_size, *shrunk)
+
+    logging.info(
+        "-- Image %s downscaled from %d to %d bytes",
+        filename,
+        len(data),
+        len(shrunk[0])
+    )
+    return shrunk[0], Path(filename).stem + shrunk[1]
+
+
+async def image_processor_shutdown():
+    """Stop the image worker processes, dropping the pending encodes"""
+    _reset_executor()
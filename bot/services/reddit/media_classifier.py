@@ -0,0 +1,175 @@
+"""
+bot/services/reddit/media_classifier.py
+© by hassanpacary
+
+Utility functions for deciding whether a link submission points to a media the bot can send
+"""
+
+# --- Imports ---
+import asyncio
+import logging
+from pathlib import PurePosixPath
+from urllib.parse import urlparse
+
+# --- Third party imports ---
+import aiohttp
+
+# --- Bot modules ---
+from bot.core.config_loader import BOT, REGEX
+from bot.utils.aiohttp_client import aiohttp_client
+from bot.utils.lru_cache import LruCache
+from bot.utils.strings_utils import matches_pattern
+
+
+# Extensions of the images Discord can display
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+
+# Submission post_hint values Reddit sets when the link isn't a direct image
+NOT_IMAGE_POST_HINTS = ("self", "link", "hosted:video", "rich:video")
+
+# Media kinds returned by the classifier
+IMAGE = "image"
+YOUTUBE = "youtube"
+
+# --- Classification results by URL, HEAD answers included ---
+_url_cache = LruCache(
+    name="media_classes",
+    max_size=BOT['reddit']['media_classifier']['url_cache_size']
+)
+
+# --- HEAD answers by host and extension, learned so new URLs of a media host skip the HEAD ---
+_domain_cache = LruCache(
+    name="media_domains",
+    max_size=BOT['reddit']['media_classifier']['domain_cache_size'],
+    ttl=BOT['reddit']['media_classifier']['domain_ttl']
+)
+
+
+#  ██████╗██╗      █████╗ ███████╗███████╗██╗███████╗██╗   ██╗
+# ██╔════╝██║     ██╔══██╗██╔════╝██╔════╝██║██╔════╝╚██╗ ██╔╝
+# ██║     ██║     ███████║███████╗███████╗██║█████╗   ╚████╔╝
+# ██║     ██║     ██╔══██║╚════██║╚════██║██║██╔══╝    ╚██╔╝
+# ╚██████╗███████╗██║  ██║███████║███████║██║██║        ██║
+#  ╚═════╝╚══════╝╚═╝  ╚═╝╚══════╝╚══════╝╚═╝╚═╝        ╚═╝
+
+
+def _classify_from_submission(submission, url: str) -> str | None:
+    """
+    Classify a link from the data Reddit already sent, without any request
+
+    Parameters:
+        submission (asyncpraw.models.Submission): The Reddit submission
+        url (str): The submission URL
+
+    Returns:
+        str | None: IMAGE or YOUTUBE when it's certain, "" when it's certainly not a media,
+                    None if undecided
+    """
+    if matches_pattern(REGEX['youtube']['pattern'], url):
+        return YOUTUBE
+
+    # --- Text posts, web pages and videos are never images ---
+    post_hint = getattr(submission, "post_hint", None)
+
+    if getattr(submission, "is_self", False) or post_hint in NOT_IMAGE_POST_HINTS:
+        return ""
+
+    # Reddit already inspected the link to build the post preview
+    if post_hint == IMAGE:
+        return IMAGE
+
+    extension = PurePosixPath(urlparse(url).path).suffix.lower()
+
+    # --- Any other extension (.gifv pages, .mp4 videos...) needs its Content-Type ---
+    if extension:
+        return IMAGE if extension in IMAGE_EXTENSIONS else None
+
+    # --- Extension-less URL, trust the preview and the known image hosts ---
+    preview = getattr(submission, "preview", None) or {}
+    domain = urlparse(url).netloc.lower()
+
+    if (post_hint is None and preview.get("enabled")) or (
+            domain in BOT['reddit']['media_classifier']['image_domains']
+    ):
+        return IMAGE
+
+    return None
+
+
+async def _classify_from_head(url: str) -> str | None:
+    """
+    Classify a link from its Content-Type, the last resort as it costs a round-trip
+
+    Parameters:
+        url (str): The submission URL
+
+    Returns:
+        str | None: IMAGE if the server answers an image content type, "" if it doesn't,
+                    None if the request failed
+    """
+    try:
+        async with aiohttp_client.session.head(url, timeout=5, allow_redirects=True) as resp:
+            content_type = resp.headers.get("Content-Type", "")
+
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logging.warning("Failed to classify media from HEAD request: %s.\n%s", url, e)
+        return None
+
+    return IMAGE if content_type.startswith("image/") else ""
+
+
+def _get_domain_key(url: str) -> tuple[str, str]:
+    """
+    Key of a URL in the domain cache
+
+    The extension is part of the key, a host serves pages and images under different ones
+
+    Parameters:
+        url (str): The submission URL
+
+    Returns:
+        tuple[str, str]: The lowercased host and extension of the URL
+    """
+    parsed = urlparse(url)
+    return parsed.netloc.lower(), PurePosixPath(parsed.path).suffix.lower()
+
+
+async def classify_submission_media(submission) -> str | None:
+    """
+    Decide whether a link submission points to a media the bot can send
+
+    Uses post_hint, extension, preview and known image hosts first.
+    A HEAD request is only sent when these are inconclusive and the host hasn't answered
+    for the same extension recently, its answer is cached for the URL and for the host
+
+    Parameters:
+        submission (asyncpraw.models.Submission): The Reddit submission
+
+    Returns:
+        str | None: IMAGE, YOUTUBE or None if the link isn't a media
+    """
+    url = submission.url
+
+    # --- Already classified ---
+    cached = _url_cache.get(url)
+    if cached is not None:
+        return cached or None
+
+    kind = _classify_from_submission(submission, url)
+
+    # --- Same host and extension already answered a HEAD request ---
+    if kind is None:
+        domain_key = _get_domain_key(url)
+        kind = _domain_cache.get(domain_key)
+
+        # --- Last resort, a failed request isn't cached ---
+        if kind is None:
+            kind = await _classify_from_head(url)
+            if kind is None:
+                return None
+
+            _domain_cache.set(domain_key, kind)
+
+    # Empty string caches the "not a media" result, None means a miss
+    _url_cache.set(url, kind)
+    return kind or None
@@ -6,16 +6,29 @@ Utility functions for send reddit submission data to user
 """
 
 # --- Imports ---
+import asyncio
+import functools
 import logging
+from collections import deque
 
 # --- Third party imports ---
 import discord
 
 # --- Bot modules ---
-from bot.core.config_loader import REGEX
-from bot.services.reddit.video_compressor import get_video
+from bot.core.config_loader import BOT, REGEX, STRINGS
+from bot.services.reddit.attachment_index import (
+    can_relink,
+    get_attachment_url,
+    hash_bytes,
+    remember_attachments)
+from bot.services.reddit.image_processor import downscale_image, is_animated_gif
+from bot.services.reddit.transcode_scheduler import ProgressCallback
+from bot.services.reddit.video_compressor import convert_gif_to_mp4, get_video
 from bot.utils.aiohttp_client import aiohttp_client
+from bot.utils.byte_budget import media_budget
 from bot.utils.discord_utils import send_response_to_discord, create_discord_file
+from bot.utils.media_probe import hash_file
+from bot.utils.reply_sequencer import TurnCallback
 from bot.utils.strings_utils import get_string_segment, matches_pattern
 
 
@@ -27,108 +40,425 @@ from bot.utils.strings_utils import get_string_segment, matches_pattern
 # ╚═════╝ ╚═╝╚══════╝╚═╝     ╚═╝  ╚═╝   ╚═╝    ╚═════╝╚═╝  ╚═╝╚══════╝╚═╝  ╚═╝
 
 
-async def _send_images_batch(
-        ctx: discord.Interaction | discord.Message,
+# Maximum number of attachments in one Discord message
+MAX_FILES_PER_MESSAGE = 10
+
+# Maximum number of characters in one Discord message
+MAX_MESSAGE_LENGTH = 2000
+
+
+async def _download_image(
+        url: str,
+        semaphore: asyncio.Semaphore,
+        filesize_limit: int,
+        priority: int = 0
+) -> tuple[bytes, str] | None:
+    """
+    Downloads an image, animated GIFs are converted to MP4
+
+    Parameters:
+        url (str): The image URL
+        semaphore (asyncio.Semaphore): Bounds the number of concurrent downloads
+        filesize_limit (int): Maximum upload size in bytes
+        priority (int): Priority of the GIF transcode job, lowest runs first
+
+    Returns:
+        tuple[bytes, str] | None: The image data and its filename, or None if the download failed
+    """
+    async with semaphore:
+        data = await aiohttp_client.download_bytes(url)
+
+    if data is None:
+        logging.warning("-- Image %s dropped from reply, download failed", url)
+        return None
+
+    filename = get_string_segment(string=url, split_char="/", i=1)
+
+    # --- Animated GIF, H.264 is an order of magnitude lighter ---
+    if await is_animated_gif(data):
+        converted = await convert_gif_to_mp4(
+            data=data,
+            filename=filename,
+            max_size=filesize_limit,
+            priority=priority
+        )
+        if converted:
+            return converted
+
+    return data, filename
+
+
+def _settle_download(reservation: int, task: asyncio.Task):
+    """Swap the media budget reservation of a finished image download for the image size"""
+    succeeded = not task.cancelled() and task.exception() is None and task.result()
+    media_budget.settle(reservation, len(task.result()[0]) if succeeded else 0)
+
+
+async def _send_images_message(
+        ctx: discord.Interaction | discord.Message | discord.TextChannel,
+        images: list[tuple[bytes, str]]
+):
+    """
+    Sends a group of images as the attachments of one Discord message
+
+    Parameters:
+        ctx (discord.Message | discord.Interaction | discord.TextChannel):
+            The message or interaction to respond to, or the channel to post in
+        images (list[tuple[bytes, str]]): The images data and filenames
+    """
+    content_hashes = [hash_bytes(data) for data, _ in images]
+
+    # --- Every image has already been uploaded, re-link their CDN URLs ---
+    if can_relink(ctx):
+        urls = [get_attachment_url(content_hash) for content_hash in content_hashes]
+        content = "\n".join(filter(None, urls))
+
+        if all(urls) and len(content) <= MAX_MESSAGE_LENGTH:
+            await send_response_to_discord(ctx=ctx, content=content, detach=True)
+            logging.info("-- %s images re-linked from previous uploads", len(urls))
+            return
+
+    files = [await create_discord_file(filename=filename, data=data) for data, filename in images]
+    message = await send_response_to_discord(ctx=ctx, files=files, detach=True)
+    remember_attachments(message, content_hashes)
+
+
+async def _send_images_batch( # pylint: disable=too-many-arguments
+        ctx: discord.Interaction | discord.Message | discord.TextChannel,
         urls: list[str],
+        filesize_limit: int,
         message_content: str,
         message_embed: discord.Embed,
+        *,
+        priority: int = 0,
+        turn: TurnCallback | None = None
 ):
     """
-    Downloads a list of image URLs and sends them to Discord in batches of up to 10 files
+    Downloads a list of image URLs and packs them into as few Discord messages as possible
+
+    Images are packed in gallery order into messages of up to 10 files whose cumulative
+    size stays under the guild upload limit. Any single image over the limit is downscaled.
+    Downloads run with a bounded concurrency and keep going while a message is uploaded.
+    Animated GIFs are converted to MP4 on the transcode scheduler. Failed images are dropped.
+    Every download reserves bytes from the media budget before it starts, settled to the size
+    of the image once downloaded and released once sent. When the budget is full prefetching
+    stops and a partial message may be sent before waiting for room
 
     Parameters:
-        ctx (discord.Message | discord.Interaction): The message or interaction to respond to
+        ctx (discord.Message | discord.Interaction | discord.TextChannel):
+            The message or interaction to respond to, or the channel to post in
         urls (list[str]): List of image URLs to download and send
+        filesize_limit (int): Maximum upload size of a message in bytes
         message_content (str): Content to send
         message_embed (discord.Embed): Discord embed to send
+        priority (int): Priority of the GIF transcode jobs, lowest runs first
+        turn (TurnCallback | None): Coroutine awaited before sending, to keep replies in order
     """
-    batch = []
+    # pylint: disable=too-many-locals,too-many-statements
+    concurrency = BOT['reddit']['images_download_concurrency']
+    reservation = BOT['media']['download_reservation']
+    semaphore = asyncio.Semaphore(concurrency)
+    remaining_urls = deque(urls)
+    downloads = deque()
+    message_images = []
+    message_size = 0
+    image_size = 0
+    messages = 0
+    sent = 0
 
-    await send_response_to_discord(ctx=ctx, content=message_content, embed=message_embed)
+    async def schedule_downloads():
+        """Keep up to two messages worth of downloads ahead of the packing, within the budget"""
+        while len(downloads) < 2 * MAX_FILES_PER_MESSAGE:
+            if sum(not task.done() for task in downloads) >= concurrency:
+                return
 
-    for i, url in enumerate(urls, start=1):
-        data = await aiohttp_client.download_bytes(url)
+            if not remaining_urls:
+                return
+
+            if not media_budget.try_acquire(reservation):
+                # Waiting while holding images could deadlock replies waiting on each other
+                if downloads or message_images:
+                    return
+                await media_budget.acquire(reservation)
+
+            # Settled by a callback, a download cancelled before it starts still gives it back
+            task = asyncio.create_task(
+                _download_image(remaining_urls.popleft(), semaphore, filesize_limit, priority)
+            )
+            task.add_done_callback(functools.partial(_settle_download, reservation))
+            downloads.append(task)
+
+    async def send_message():
+        """Send the packed images and give their bytes back to the budget"""
+        nonlocal message_images, message_size, messages, sent
+
+        await _send_images_message(ctx=ctx, images=message_images)
+        media_budget.release(message_size)
+        messages += 1
+        sent += len(message_images)
+        message_images, message_size = [], 0
+
+    try:
+        # Images held while waiting for the turn would starve the previous replies of budget
+        if turn:
+            await turn()
+
+        # The first images are downloaded while the embed is sent
+        await schedule_downloads()
 
-        filename = get_string_segment(string=url, split_char="/", i=1)
+        await send_response_to_discord(ctx=ctx, content=message_content, embed=message_embed)
 
-        file = await create_discord_file(filename=filename, data=data)
-        batch.append(file)
+        while downloads:
+            # Any finished download frees a slot, the pipeline is refilled before the head is done
+            if not downloads[0].done():
+                await asyncio.wait(downloads, return_when=asyncio.FIRST_COMPLETED)
+                await schedule_downloads()
+                continue
 
-        if len(batch) == 10 or i == len(urls):
-            await send_response_to_discord(ctx=ctx, files=batch, detach=True)
-            batch = []
+            image = downloads.popleft().result()
+            image_size = len(image[0]) if image else 0
+
+            if image is not None:
+                # --- Image alone is over the limit, downscale it ---
+                if len(image[0]) > filesize_limit:
+                    shrunk = await downscale_image(
+                        data=image[0],
+                        filename=image[1],
+                        max_size=filesize_limit
+                    )
+                    image_size = len(shrunk[0]) if shrunk else 0
+                    media_budget.charge(image_size)
+                    media_budget.release(len(image[0]))
+                    image = shrunk
+
+            if image is not None:
+                # --- Image doesn't fit in the current message, send it ---
+                if message_images and (
+                        len(message_images) == MAX_FILES_PER_MESSAGE
+                        or message_size + len(image[0]) > filesize_limit
+                ):
+                    await send_message()
+
+                message_images.append(image)
+                message_size += image_size
+                image_size = 0
+
+            await schedule_downloads()
+
+            # --- No room left for the next download, send what's packed to make some ---
+            if not downloads and message_images and remaining_urls:
+                await send_message()
+                await schedule_downloads()
+
+        if message_images:
+            await send_message()
+
+    finally:
+        media_budget.release(message_size + image_size)
+
+        for task in downloads:
+            # Pending downloads give their reservation back when cancelled, done ones their image
+            if task.done() and not task.cancelled() and task.exception() is None and task.result():
+                media_budget.release(len(task.result()[0]))
+            task.cancel()
 
     logging.info(
-        "-- %s images has been uploaded in reply",
-        len(urls)
+        "-- %s/%s images has been uploaded in reply, in %s messages",
+        sent,
+        len(urls),
+        messages
     )
 
 
-async def _send_video(
-        ctx: discord.Interaction | discord.Message,
+def _can_edit(
+        ctx: discord.Interaction | discord.Message | discord.TextChannel,
+        message: discord.Message | None
+) -> bool:
+    """Check whether a reply can still be edited, interaction tokens expire after 15 minutes"""
+    if message is None:
+        return False
+
+    return not (isinstance(ctx, discord.Interaction) and ctx.is_expired())
+
+
+def _close_ready_video(video_task: asyncio.Task):
+    """Close the files of a video task that finished successfully, temporary outputs included"""
+    if video_task.done() and not video_task.cancelled() and video_task.exception() is None:
+        for file in video_task.result():
+            file.close()
+
+
+async def _send_video( # pylint: disable=too-many-arguments,too-many-locals,too-many-branches
+        ctx: discord.Interaction | discord.Message | discord.TextChannel,
         url: str,
         filesize_limit: int,
         message_content: str,
         message_embed: discord.Embed,
+        *,
+        priority: int = 0,
+        on_progress: ProgressCallback | None = None,
+        turn: TurnCallback | None = None,
+        poster_url: str | None = None
 ):
     """
     Send video as a Discord response
 
+    The embed is sent right away with the poster as its image while the video is downloaded
+    and compressed, the video then replaces the poster in the same message.
+    The parts of a split video are sent as the following messages
+
     Parameters:
-        ctx (discord.Interaction | discord.Message):
-            The target to respond to (Discord interaction or message)
+        ctx (discord.Interaction | discord.Message | discord.TextChannel):
+            The target to respond to (Discord interaction, message or channel)
         url (str): The video URL to download
         filesize_limit (int): Maximum allowed file size in bytes (e.g., Discord's 10 MB limit)
         message_content (str): message content
         message_embed (discord.Embed): message embed
+        priority (int): Priority of the transcode job, lowest runs first
+        on_progress (ProgressCallback | None): Coroutine called with the transcode progress ratio
+        turn (TurnCallback | None): Coroutine awaited before sending, to keep replies in order
+        poster_url (str | None): Preview image shown until the video is ready
     """
     filename = get_string_segment(string=url, split_char="/", i=2)
 
-    file = await get_video(url=url, filename=filename, file_size_limit=filesize_limit)
+    # The video is prepared while the embed waits for its turn and is sent
+    video_task = asyncio.create_task(get_video(
+        url=url,
+        filename=filename,
+        file_size_limit=filesize_limit,
+        priority=priority,
+        on_progress=on_progress
+    ))
+
+    message = None
+    files = None
+
+    try:
+        if turn:
+            await turn()
+
+        if poster_url:
+            message_embed.set_image(url=poster_url)
+
+        message = await send_response_to_discord(
+            ctx=ctx,
+            content=message_content,
+            embed=message_embed
+        )
+        files = await video_task
+
+    except Exception:
+        # --- The embed is already out, it must not pass the poster off as the video ---
+        if _can_edit(ctx, message):
+            message_embed.set_image(url=None)
+
+            try:
+                await message.edit(
+                    content=message_content + "\n" + STRINGS['reddit']['video_failed'],
+                    embed=message_embed
+                )
+
+            except discord.HTTPException as e:
+                logging.warning("Failed to flag the failed video in its embed message.\n%s", e)
+        raise
+
+    finally:
+        # --- Ready but never handed over, its outputs would stay open on disk ---
+        if files is None:
+            _close_ready_video(video_task)
+
+        # No-op once the video is ready, stops the download or transcode otherwise
+        video_task.cancel()
+
+    # The video takes the place of the poster
+    message_embed.set_image(url=None)
+    relink = can_relink(ctx)
+
+    try:
+        # --- The first part goes in the embed message, the next ones follow it ---
+        for part, file in enumerate(files):
+            content_hash = await hash_file(file.fp.name)
+            attachment_url = get_attachment_url(content_hash) if relink else None
+            edit = part == 0 and _can_edit(ctx, message)
+
+            # --- Same video already uploaded, re-link its CDN URL ---
+            if attachment_url:
+                if edit:
+                    await message.edit(
+                        content=message_content + "\n" + attachment_url,
+                        embed=message_embed
+                    )
+                else:
+                    await send_response_to_discord(ctx=ctx, content=attachment_url, detach=True)
+                continue
 
-    await send_response_to_discord(ctx=ctx, content=message_content, embed=message_embed)
-    await send_response_to_discord(ctx=ctx, files=[file], detach=True)
-    logging.info("-- Reddit video has been uploaded in reply")
+            if edit:
+                sent = await message.edit(embed=message_embed, attachments=[file])
+            else:
+                sent = await send_response_to_discord(ctx=ctx, files=[file], detach=True)
 
+            remember_attachments(sent, [content_hash])
 
-async def dispatch_medias_response(
-        ctx: discord.Interaction | discord.Message ,
+    finally:
+        for file in files:
+            file.close()
+
+    logging.info("-- Reddit video has been sent in reply, in %d part(s)", len(files))
+
+
+async def dispatch_medias_response( # pylint: disable=too-many-arguments
+        ctx: discord.Interaction | discord.Message | discord.TextChannel,
         medias: list[str],
         message_content: str,
         message_embed: discord.Embed,
+        *,
+        priority: int = 0,
+        on_progress: ProgressCallback | None = None,
+        turn: TurnCallback | None = None,
+        poster_url: str | None = None
 ):
     """
     Dispatches and sends a list of media URLs
     (Reddit videos, YouTube links, or images) to Discord
 
     Parameters:
-        ctx (discord.Interaction | discord.Message):
-                The target to respond to (Discord interaction or message)
+        ctx (discord.Interaction | discord.Message | discord.TextChannel):
+                The target to respond to (Discord interaction, message or channel)
         medias (list[str]): List of media URLs to send
         message_content (str): message content
         message_embed (discord.Embed): message embed
+        priority (int): Priority of the transcode jobs, lowest runs first
+        on_progress (ProgressCallback | None): Coroutine called with the transcode progress ratio
+        turn (TurnCallback | None): Coroutine awaited before sending, to keep replies in order
+        poster_url (str | None): Preview image shown until a Reddit video is ready
     """
     pattern = REGEX['youtube']['pattern']
     is_video = medias[0].split('?')[0].endswith(".mp4")
 
+    if ctx.guild is None:
+        filesize_limit = 10 * 1024 * 1024
+    else:
+        filesize_limit = ctx.guild.filesize_limit
+
     # --- Reddit video ---
     if is_video :
-
-        if ctx.guild is None:
-            filesize_limit = 10 * 1024 * 1024
-        else:
-            filesize_limit = ctx.guild.filesize_limit
-
         await _send_video(
             ctx=ctx,
             url=medias[0],
             filesize_limit=filesize_limit,
             message_content=message_content,
             message_embed=message_embed,
+            priority=priority,
+            on_progress=on_progress,
+            turn=turn,
+            poster_url=poster_url
         )
 
     # --- Youtube video ---
     elif matches_pattern(pattern, medias[0]):
+        if turn:
+            await turn()
+
         await send_response_to_discord(
             ctx=ctx,
             content=message_content + "\n" + medias[0],
@@ -140,6 +470,9 @@ async def dispatch_medias_response(
         await _send_images_batch(
             ctx=ctx,
             urls=medias,
+            filesize_limit=filesize_limit,
             message_content=message_content,
             message_embed=message_embed,
+            priority=priority,
+            turn=turn
         )
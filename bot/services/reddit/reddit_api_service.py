@@ -6,16 +6,26 @@ Utility functions for fetching images from Reddit posts and sending them to Disc
 """
 
 # --- Imports ---
+import asyncio
+import copy
+import html
+import logging
 import os
 from datetime import datetime
+from typing import Optional
+from urllib.parse import urljoin
 
 # --- Third party imports ---
+import aiohttp
 import asyncpraw
 
 # --- bot modules ---
-from bot.core.config_loader import REGEX
+from bot.core.config_loader import BOT, REGEX
+from bot.services.reddit.media_classifier import classify_submission_media
 from bot.utils.aiohttp_client import aiohttp_client
-from bot.utils.strings_utils import matches_pattern
+from bot.utils.http_metrics import http_metrics
+from bot.utils.lru_cache import LruCache
+from bot.utils.strings_utils import regex_search
 
 
 # pylint: disable=line-too-long
@@ -32,16 +42,323 @@ def _create_reddit_client() -> asyncpraw.Reddit:
     """
     Creates and returns an asyncpraw Reddit client using environment variables
 
+    The client gets its own aiohttp session (asyncprawcore overrides its User-Agent),
+    traced into `http_metrics` like the shared aiohttp client
+
     Returns:
         asyncpraw.reddit.Reddit client
     """
+    session = aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=None),
+        trace_configs=[http_metrics.trace_config(pool="reddit")]
+    )
+
     return asyncpraw.Reddit(
         client_id=os.environ["REDDIT_CLIENT_ID"],
         client_secret=os.environ["REDDIT_CLIENT_SECRET"],
-        user_agent=os.environ["REDDIT_USER_AGENT"]
+        user_agent=os.environ["REDDIT_USER_AGENT"],
+        requestor_kwargs={"session": session}
     )
 
 
+class RedditClient:
+    """Singleton-like holder reusing a single asyncpraw.Reddit client for the whole process"""
+
+    _reddit: Optional[asyncpraw.Reddit] = None
+
+    @property
+    def reddit(self) -> asyncpraw.Reddit:
+        """
+        Return the shared asyncpraw.Reddit client
+
+        The client is created on first use, and again if it has been closed.
+        The OAuth token is fetched on the first request and refreshed by asyncprawcore
+        whenever it expires, so a single client can live as long as the bot
+
+        Returns:
+            asyncpraw.Reddit: The active Reddit client
+        """
+        if not self._reddit or self._reddit.requestor.closed:
+            self._reddit = _create_reddit_client()
+
+        return self._reddit
+
+    async def close(self):
+        """Close the asyncpraw.Reddit client and its HTTP session cleanly"""
+        if self._reddit and not self._reddit.requestor.closed:
+            await self._reddit.close()
+
+
+# --- Singleton instance for global usage ---
+reddit_client = RedditClient()
+
+
+async def reddit_shutdown():
+    """Convenience function to close the global reddit_client"""
+    await reddit_client.close()
+
+
+#  ██████╗ █████╗  ██████╗██╗  ██╗███████╗███████╗
+# ██╔════╝██╔══██╗██╔════╝██║  ██║██╔════╝██╔════╝
+# ██║     ███████║██║     ███████║█████╗  ███████╗
+# ██║     ██╔══██║██║     ██╔══██║██╔══╝  ╚════██║
+# ╚██████╗██║  ██║╚██████╗██║  ██║███████╗███████║
+#  ╚═════╝╚═╝  ╚═╝ ╚═════╝╚═╝  ╚═╝╚══════╝╚══════╝
+
+
+# Extracted submission data, keyed by submission id (a repost within minutes needs no API call)
+submission_cache = LruCache(
+    name="reddit_submissions",
+    max_size=BOT['reddit']['submission_cache']['max_size'],
+    ttl=BOT['reddit']['submission_cache']['ttl']
+)
+
+# Subreddit display name and icon, keyed by lowercased subreddit name (rarely change)
+subreddit_cache = LruCache(
+    name="reddit_subreddits",
+    max_size=BOT['reddit']['subreddit_cache']['max_size'],
+    ttl=BOT['reddit']['subreddit_cache']['ttl']
+)
+
+
+async def _get_subreddit_data(subreddit, sr_detail: dict | None = None) -> dict:
+    """
+    Return the subreddit display name and icon, loading the subreddit only on a cache miss
+
+    Parameters:
+        subreddit (asyncpraw.models.Subreddit): The lazy subreddit object of a submission
+        sr_detail (dict | None): Subreddit details embedded in an /api/info response, if any
+
+    Returns:
+        dict: Subreddit display name and icon url
+    """
+    key = subreddit.display_name.lower()
+    subreddit_data = subreddit_cache.get(key)
+
+    if subreddit_data is None and sr_detail:
+        subreddit_data = {
+            "display_name": sr_detail.get("display_name", subreddit.display_name),
+            "icon_img": sr_detail.get("icon_img", "")
+        }
+        subreddit_cache.set(key, subreddit_data)
+
+    if subreddit_data is None:
+        await subreddit.load()
+        subreddit_data = {
+            "display_name": subreddit.display_name,
+            "icon_img": subreddit.icon_img
+        }
+        subreddit_cache.set(key, subreddit_data)
+
+    return subreddit_data
+
+
+# ██████╗  █████╗ ████████╗ ██████╗██╗  ██╗███████╗██████╗
+# ██╔══██╗██╔══██╗╚══██╔══╝██╔════╝██║  ██║██╔════╝██╔══██╗
+# ██████╔╝███████║   ██║   ██║     ███████║█████╗  ██████╔╝
+# ██╔══██╗██╔══██║   ██║   ██║     ██╔══██║██╔══╝  ██╔══██╗
+# ██████╔╝██║  ██║   ██║   ╚██████╗██║  ██║███████╗██║  ██║
+# ╚═════╝ ╚═╝  ╚═╝   ╚═╝    ╚═════╝╚═╝  ╚═╝╚══════╝╚═╝  ╚═╝
+
+
+# A single entry point, `fetch`, shared by every caller
+class SubmissionBatcher:  # pylint: disable=too-few-public-methods
+    """
+    Coalesce submission lookups into batched requests to Reddit's /api/info endpoint
+
+    `reddit.submission(url=...)` goes through the comments endpoint and downloads a comment tree
+    we never use. /api/info resolves up to 100 fullnames in a single call and only returns
+    the flat submission data, with `sr_detail` carrying the subreddit icon.
+    Lookups arriving within `window` seconds of each other share one request
+    """
+
+    # Maximum number of fullnames accepted by /api/info
+    MAX_BATCH = 100
+
+    def __init__(self, window: float):
+        """Initialize the batcher with the time to wait for other lookups before a request"""
+        self.window = window
+        self._pending: dict[str, list[asyncio.Future]] = {}
+        self._flush_task: asyncio.Task | None = None
+
+        # Strong references to running requests, so they are not garbage collected
+        self._requests: set[asyncio.Task] = set()
+
+    async def fetch(self, submission_id: str):
+        """
+        Fetch a submission through the next batched /api/info request
+
+        Parameters:
+            submission_id (str): Base36 id of the submission
+
+        Returns:
+            asyncpraw.models.Submission | None: The submission, or None if Reddit didn't return it
+                                                or the batch request failed
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(submission_id, []).append(future)
+
+        # --- Batch is full, send it right away ---
+        if len(self._pending) >= self.MAX_BATCH:
+            if self._flush_task:
+                self._flush_task.cancel()
+                self._flush_task = None
+
+            pending, self._pending = self._pending, {}
+            request = asyncio.create_task(self._request(pending))
+            self._requests.add(request)
+            request.add_done_callback(self._requests.discard)
+
+        # --- First lookup of a batch, wait for others ---
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+            self._requests.add(self._flush_task)
+            self._flush_task.add_done_callback(self._requests.discard)
+
+        return await future
+
+    async def _flush_later(self):
+        """Wait for the batch window, then send the pending lookups"""
+        await asyncio.sleep(self.window)
+
+        pending, self._pending = self._pending, {}
+        self._flush_task = None
+
+        await self._request(pending)
+
+    async def _request(self, pending: dict[str, list[asyncio.Future]]):
+        """Resolve a batch of pending lookups with a single /api/info request"""
+        try:
+            listing = await reddit_client.reddit.get(
+                "/api/info",
+                params={
+                    "id": ",".join(f"t3_{submission_id}" for submission_id in pending),
+                    "sr_detail": "true"
+                }
+            )
+            found = {submission.id: submission for submission in listing}
+
+            logging.info(
+                "-- Fetched %d/%d submissions with one /api/info request",
+                len(found),
+                len(pending)
+            )
+
+            for submission_id, futures in pending.items():
+                for future in futures:
+                    if not future.done():
+                        future.set_result(found.get(submission_id))
+
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.warning(
+                "Batched /api/info request failed, %d submissions fetched one by one.\n%s",
+                len(pending),
+                e
+            )
+
+            # None sends every waiter to the per-submission fetch
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_result(None)
+
+
+# --- Singleton instance for global usage ---
+submission_batcher = SubmissionBatcher(window=BOT['reddit']['batch_window'])
+
+
+# ███████╗██╗  ██╗ █████╗ ██████╗ ███████╗    ██╗     ██╗███╗   ██╗██╗  ██╗███████╗
+# ██╔════╝██║  ██║██╔══██╗██╔══██╗██╔════╝    ██║     ██║████╗  ██║██║ ██╔╝██╔════╝
+# ███████╗███████║███████║██████╔╝█████╗      ██║     ██║██╔██╗ ██║█████╔╝ ███████╗
+# ╚════██║██╔══██║██╔══██║██╔══██╗██╔══╝      ██║     ██║██║╚██╗██║██╔═██╗ ╚════██║
+# ███████║██║  ██║██║  ██║██║  ██║███████╗    ███████╗██║██║ ╚████║██║  ██╗███████║
+# ╚══════╝╚═╝  ╚═╝╚═╝  ╚═╝╚═╝  ╚═╝╚══════╝    ╚══════╝╚═╝╚═╝  ╚═══╝╚═╝  ╚═╝╚══════╝
+
+
+# Share links (/r/<sub>/s/<token>) redirect to the same post forever
+share_link_cache = LruCache(
+    name="reddit_share_links",
+    max_size=BOT['reddit']['share_link_cache_size']
+)
+
+
+async def resolve_share_link(url: str) -> str:
+    """
+    Resolve a Reddit share link to the post URL it redirects to
+
+    Parameters:
+        url (str): Any Reddit URL
+
+    Returns:
+        str: The post URL, or the given URL if it isn't a share link or can't be resolved
+    """
+    # The share link pattern isn't anchored to the scheme, it's searched anywhere in the URL
+    if regex_search(REGEX['reddit_share_link']['pattern'], url) is None:
+        return url
+
+    resolved = share_link_cache.get(url)
+    if resolved is not None:
+        return resolved
+
+    # Only the redirect location is needed, the post page itself is never downloaded
+    try:
+        async with aiohttp_client.session.head(
+                url,
+                allow_redirects=False,
+                headers={"User-Agent": os.environ["REDDIT_USER_AGENT"]}
+        ) as resp:
+            location = resp.headers.get("Location")
+
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logging.warning("Failed to resolve Reddit share link: %s.\n%s", url, e)
+        return url
+
+    if not location:
+        logging.warning("Reddit share link without redirect: %s (status %s)", url, resp.status)
+        return url
+
+    resolved = urljoin(url, location)
+    share_link_cache.set(url, resolved)
+
+    logging.info("-- Reddit share link %s resolved to %s", url, resolved)
+    return resolved
+
+
+# ███████╗██╗  ██╗████████╗██████╗  █████╗  ██████╗████████╗
+# ██╔════╝╚██╗██╔╝╚══██╔══╝██╔══██╗██╔══██╗██╔════╝╚══██╔══╝
+# █████╗   ╚███╔╝    ██║   ██████╔╝███████║██║        ██║
+# ██╔══╝   ██╔██╗    ██║   ██╔══██╗██╔══██║██║        ██║
+# ███████╗██╔╝ ██╗   ██║   ██║  ██║██║  ██║╚██████╗   ██║
+# ╚══════╝╚═╝  ╚═╝   ╚═╝   ╚═╝  ╚═╝╚═╝  ╚═╝ ╚═════╝   ╚═╝
+
+
+def _get_poster_url(submission) -> str | None:
+    """
+    Pick a lightweight preview image of a submission, shown while its video is prepared
+
+    Parameters:
+        submission (asyncpraw.models.Submission): The Reddit submission object
+
+    Returns:
+        str | None: URL of the largest preview under the configured width, None if no preview
+    """
+    images = (getattr(submission, "preview", None) or {}).get("images")
+
+    if not images:
+        return None
+
+    max_width = BOT['reddit']['poster_max_width']
+    candidates = [
+        resolution for resolution in images[0].get("resolutions", [])
+        if resolution.get("width", 0) <= max_width
+    ]
+    poster = max(candidates, key=lambda resolution: resolution['width'], default=None)
+    poster = poster or images[0].get("source")
+
+    # Reddit escapes the query string of preview URLs
+    return html.unescape(poster['url']) if poster else None
+
+
 async def _extract_submission_data(submission) -> dict:
     """
     Extracts data from submission data with media URLs from a Reddit submission
@@ -52,13 +369,13 @@ async def _extract_submission_data(submission) -> dict:
     Returns:
         list[str]: List of all submission data
     """
-    pattern = REGEX['youtube']['pattern']
-
     post_created_date = datetime.fromtimestamp(submission.created_utc)
 
-    # Load the subreddit object
-    subreddit = submission.subreddit
-    await subreddit.load()
+    # Load the subreddit data
+    subreddit = await _get_subreddit_data(
+        submission.subreddit,
+        sr_detail=getattr(submission, "sr_detail", None)
+    )
 
     # All submissions data retrieve
     submission_data = {
@@ -66,17 +383,19 @@ async def _extract_submission_data(submission) -> dict:
         "post_url": submission.url,
         "post_content": submission.selftext,
         "creation_date": post_created_date,
-        "subreddit_name": subreddit.display_name,
+        "subreddit_name": subreddit['display_name'],
         "author_name": getattr(submission.author, "name", "") or "",
-        "subreddit_icon": subreddit.icon_img,
+        "subreddit_icon": subreddit['icon_img'],
         "upvote_number": submission.score,
         "responses_number": submission.num_comments,
+        "poster_url": None,
         "medias": []
     }
 
     # --- Reddit video ---
     if getattr(submission, "is_video", False):
         submission_data['medias'].append(submission.media["reddit_video"]["fallback_url"])
+        submission_data['poster_url'] = _get_poster_url(submission)
 
     # --- Reddit gallery ---
     elif hasattr(submission, "gallery_data"):
@@ -86,14 +405,8 @@ async def _extract_submission_data(submission) -> dict:
             submission_data['medias'].append(meta["s"]["u"])
 
     # --- single image or YouTube link ---
-    else:
-        url = submission.url
-
-        async with aiohttp_client.session.head(url, timeout=5) as resp:
-            content_type = resp.headers.get("Content-Type", "")
-
-            if content_type.startswith("image/") or matches_pattern(pattern, url):
-                submission_data['medias'].append(url)
+    elif await classify_submission_media(submission) is not None:
+        submission_data['medias'].append(submission.url)
 
     return submission_data
 
@@ -108,11 +421,87 @@ async def fetch_reddit_data(url: str) -> dict:
     Returns:
         list[str]: A list of data extracted from the submission.
     """
+    submission_id = regex_search(REGEX['reddit_submission_id']['pattern'], url, group=1)
+
+    # --- Submission already fetched recently ---
+    submission_data = submission_cache.get(submission_id) if submission_id else None
+
+    if submission_data is not None:
+        return copy.deepcopy(submission_data)
 
-    # --- Create Reddit client ---
-    reddit_client = _create_reddit_client()
+    submission = None
 
-    submission = await reddit_client.submission(url=url)
+    # --- Lightweight batched fetch, without the comment tree ---
+    if submission_id and BOT['reddit']['lightweight_fetch']:
+        submission = await submission_batcher.fetch(submission_id)
+
+    # --- No id in the url, mode disabled, batch failed or not returned by /api/info ---
+    if submission is None:
+        submission = await reddit_client.reddit.submission(url=url)
+
+    # --- The cache was already looked up when the url carried the id ---
+    if submission_id is None:
+        return await get_submission_data(submission)
+
+    return await _store_submission_data(submission)
+
+
+async def _store_submission_data(submission) -> dict:
+    """
+    Extracts the data of a submission missing from the submission cache and caches it
+
+    Parameters:
+        submission (asyncpraw.models.Submission): The Reddit submission object
+
+    Returns:
+        dict: A copy of the cached submission data
+    """
     submission_data = await _extract_submission_data(submission=submission)
+    submission_cache.set(submission.id, submission_data)
 
-    return submission_data
+    # Callers may alter the medias list, never hand out the cached object
+    return copy.deepcopy(submission_data)
+
+
+async def get_submission_data(submission) -> dict:
+    """
+    Extracts the data of an already loaded submission, through the submission cache
+
+    Parameters:
+        submission (asyncpraw.models.Submission): The Reddit submission object
+
+    Returns:
+        dict: The submission data, see `fetch_reddit_data`
+    """
+    submission_data = submission_cache.get(submission.id)
+
+    if submission_data is None:
+        return await _store_submission_data(submission)
+
+    return copy.deepcopy(submission_data)
+
+
+async def fetch_new_submissions(
+        subreddits: list[str],
+        limit: int,
+        before: str | None = None) -> list:
+    """
+    Fetches the newest submissions of several subreddits with a single listing request
+
+    Parameters:
+        subreddits (list[str]): Names of the subreddits
+        limit (int): Number of submissions of the combined listing, at most 100
+        before (str | None): Fullname of the newest submission already seen,
+                             only the submissions listed before it are returned
+
+    Returns:
+        list[asyncpraw.models.Submission]: The submissions, newest first
+    """
+    # r/a+b+c/new lists every subreddit at once, sr_detail spares a request per subreddit icon
+    params = {"limit": limit, "sr_detail": "true"}
+    if before:
+        params["before"] = before
+
+    # A single page, the listing generator would page on past the cursor
+    listing = await reddit_client.reddit.get(f"r/{'+'.join(subreddits)}/new", params=params)
+    return list(listing)
@@ -5,15 +5,21 @@ bot/services/reddit/response_service.py
 Utility functions for send reddit submission data to user
 """
 
+# --- Imports ---
+import asyncio
+import logging
+
 # --- Third party imports ---
 import discord
 
 # --- Bot modules ---
 from bot.core.config_loader import STRINGS, REGEX, BOT
 from bot.services.reddit.medias_dispatcher import dispatch_medias_response
-from bot.services.reddit.reddit_api_service import fetch_reddit_data
+from bot.services.reddit.reddit_api_service import fetch_reddit_data, resolve_share_link
+from bot.services.reddit.transcode_scheduler import ProgressCallback
 from bot.utils.discord_utils import send_response_to_discord, create_discord_embed
-from bot.utils.strings_utils import matches_pattern
+from bot.utils.reply_sequencer import ReplySequencer, TurnCallback
+from bot.utils.strings_utils import matches_pattern, regex_search
 
 
 # pylint: disable=line-too-long
@@ -26,33 +32,41 @@ from bot.utils.strings_utils import matches_pattern
 # pylint: enable=line-too-long
 
 
-async def send_response_with_post_data(ctx: discord.Interaction | discord.Message, url: str):
-    """Logic of /waf command and on_message event when reddit url trigger it"""
-    color = BOT['color']['reddit']
-    responses_dict = STRINGS['reddit']
-    pattern = REGEX['reddit']['pattern']
+def _progress_reporter(defer_msg: discord.Message) -> ProgressCallback:
+    """Build a transcode progress callback editing the defer message with the percentage"""
+    async def on_progress(ratio: float):
+        await defer_msg.edit(
+            content=STRINGS['reddit']['transcode_progress'].format(percent=int(ratio * 100))
+        )
 
-    if not matches_pattern(pattern, url):
-        await send_response_to_discord(ctx=ctx, content=responses_dict['wrong_url'], ephemeral=True)
-        return
+    return on_progress
 
-    defer_msg = None
 
-    # Send defer message
-    if isinstance(ctx, discord.Interaction):
-        await ctx.response.defer() # type: ignore
-    elif isinstance(ctx, discord.Message):
-        defer_msg = await ctx.channel.send(STRINGS['system']['progress'])
+async def _send_post_data( # pylint: disable=too-many-arguments
+        ctx: discord.Interaction | discord.Message | discord.TextChannel,
+        submission_data: dict,
+        message_content: str,
+        *,
+        priority: int,
+        on_progress: ProgressCallback | None = None,
+        turn: TurnCallback | None = None
+):
+    """
+    Send the embed of a Reddit post followed by its medias
 
-    submission_data = await fetch_reddit_data(url=url)
+    Parameters:
+        ctx (discord.Interaction | discord.Message | discord.TextChannel):
+            The interaction or message to respond to, or the channel to post in
+        submission_data (dict): The post data, see `fetch_reddit_data`
+        message_content (str): Content of the embed message
+        priority (int): Priority of the transcode jobs, lowest runs first
+        on_progress (ProgressCallback | None): Coroutine called with the transcode progress ratio
+        turn (TurnCallback | None): Coroutine awaited before sending, to keep replies in order
+    """
+    color = BOT['color']['reddit']
+    responses_dict = STRINGS['reddit']
     medias = submission_data['medias']
 
-    # Prepare message content
-    message_content = (
-        responses_dict['reply_message_with_medias_count'].format(
-            medias_count=len(medias)
-        )
-    )
     message_embed = await create_discord_embed(
         color=discord.Color(int(color, 16)),
         title=submission_data['post_title'],
@@ -78,15 +92,131 @@ async def send_response_with_post_data(ctx: discord.Interaction | discord.Messag
             medias=medias,
             message_content=message_content,
             message_embed=message_embed,
+            poster_url=submission_data['poster_url'],
+            priority=priority,
+            on_progress=on_progress,
+            turn=turn
         )
 
     # --- Submission contains not medias ---
     else:
+        if turn:
+            await turn()
+
         await send_response_to_discord(
             ctx=ctx,
             content=message_content,
             embed=message_embed
         )
 
+
+async def send_response_with_post_data(
+        ctx: discord.Interaction | discord.Message,
+        url: str,
+        turn: TurnCallback | None = None
+):
+    """
+    Logic of /waf command and on_message event when reddit url trigger it
+
+    Parameters:
+        ctx (discord.Interaction | discord.Message): The interaction or message to respond to
+        url (str): The Reddit post URL, share links included
+        turn (TurnCallback | None): Coroutine awaited before sending, to keep replies in order
+    """
+    responses_dict = STRINGS['reddit']
+    pattern = REGEX['reddit']['pattern']
+
+    if not matches_pattern(pattern, url):
+        await send_response_to_discord(ctx=ctx, content=responses_dict['wrong_url'], ephemeral=True)
+        return
+
+    url = await resolve_share_link(url)
+
+    defer_msg = None
+
+    # Send defer message
+    if isinstance(ctx, discord.Interaction):
+        await ctx.response.defer() # type: ignore
+    elif isinstance(ctx, discord.Message):
+        defer_msg = await ctx.channel.send(STRINGS['system']['progress'])
+
+    submission_data = await fetch_reddit_data(url=url)
+
+    await _send_post_data(
+        ctx=ctx,
+        submission_data=submission_data,
+        message_content=responses_dict['reply_message_with_medias_count'].format(
+            medias_count=len(submission_data['medias'])
+        ),
+        # Slash commands are explicit requests, they go before links caught in messages
+        priority=0 if isinstance(ctx, discord.Interaction) else 1,
+        on_progress=_progress_reporter(defer_msg) if defer_msg else None,
+        turn=turn
+    )
+
     if defer_msg:
         await defer_msg.delete()
+
+
+async def send_responses_with_posts_data(ctx: discord.Message, urls: list[str]):
+    """
+    Reply to every Reddit post linked in a message
+
+    Posts are fetched and their medias prepared concurrently, a bounded number at a time,
+    while the replies are still sent in the order the links appear in the message.
+    Links to the same post are answered once
+
+    Parameters:
+        ctx (discord.Message): The message containing the links
+        urls (list[str]): The Reddit URLs found in the message, in order
+    """
+    # --- Share links must be resolved to spot duplicates ---
+    resolved_urls = await asyncio.gather(*[
+        resolve_share_link(url) for url in dict.fromkeys(urls)
+    ])
+
+    unique_urls = {}
+    for url in resolved_urls:
+        submission_id = regex_search(REGEX['reddit_submission_id']['pattern'], url, group=1)
+        unique_urls.setdefault(submission_id or url, url)
+
+    urls = list(unique_urls.values())
+    semaphore = asyncio.Semaphore(BOT['reddit']['links_concurrency'])
+    sequencer = ReplySequencer()
+
+    async def reply(index: int, url: str):
+        try:
+            async with semaphore:
+                await send_response_with_post_data(ctx=ctx, url=url, turn=sequencer.turn(index))
+
+        finally:
+            # A failed reply must not block the following ones
+            await sequencer.finish(index)
+
+    results = await asyncio.gather(
+        *[reply(index, url) for index, url in enumerate(urls)],
+        return_exceptions=True
+    )
+
+    for url, result in zip(urls, results):
+        if isinstance(result, Exception):
+            logging.error("Failed to reply with Reddit post %s", url, exc_info=result)
+
+
+async def send_post_to_channel(channel: discord.TextChannel, submission_data: dict):
+    """
+    Post a Reddit submission in a channel on the bot's own initiative, e.g. from a watched feed
+
+    Parameters:
+        channel (discord.TextChannel): The channel to post in
+        submission_data (dict): The post data, see `fetch_reddit_data`
+    """
+    await _send_post_data(
+        ctx=channel,
+        submission_data=submission_data,
+        message_content=STRINGS['reddit']['watcher_message'].format(
+            subreddit=submission_data['subreddit_name']
+        ),
+        # Nobody is waiting for these, user requests go first
+        priority=2
+    )
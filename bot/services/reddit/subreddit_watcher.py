@@ -0,0 +1,139 @@
+"""
+bot/services/reddit/subreddit_watcher.py
+© by hassanpacary
+
+Watcher posting the new submissions of configured subreddits in Discord channels
+"""
+
+# --- Imports ---
+import logging
+import time
+
+# --- Third party imports ---
+import discord
+
+# --- Bot modules ---
+from bot.core.config_loader import BOT
+from bot.services.reddit.reddit_api_service import fetch_new_submissions, get_submission_data
+from bot.services.reddit.reddit_service import send_post_to_channel
+from bot.utils.db_manager import DatabaseManager
+
+
+# pylint: disable=line-too-long
+# ███████╗██╗   ██╗██████╗ ██████╗ ███████╗██████╗ ██████╗ ██╗████████╗    ██╗    ██╗ █████╗ ████████╗ ██████╗██╗  ██╗███████╗██████╗
+# ██╔════╝██║   ██║██╔══██╗██╔══██╗██╔════╝██╔══██╗██╔══██╗██║╚══██╔══╝    ██║    ██║██╔══██╗╚══██╔══╝██╔════╝██║  ██║██╔════╝██╔══██╗
+# ███████╗██║   ██║██████╔╝██████╔╝█████╗  ██║  ██║██║  ██║██║   ██║       ██║ █╗ ██║███████║   ██║   ██║     ███████║█████╗  ██████╔╝
+# ╚════██║██║   ██║██╔══██╗██╔══██╗██╔══╝  ██║  ██║██║  ██║██║   ██║       ██║███╗██║██╔══██║   ██║   ██║     ██╔══██║██╔══╝  ██╔══██╗
+# ███████║╚██████╔╝██████╔╝██║  ██║███████╗██████╔╝██████╔╝██║   ██║       ╚███╔███╔╝██║  ██║   ██║   ╚██████╗██║  ██║███████╗██║  ██║
+# ╚══════╝ ╚═════╝ ╚═════╝ ╚═╝  ╚═╝╚══════╝╚═════╝ ╚═════╝ ╚═╝   ╚═╝        ╚══╝╚══╝ ╚═╝  ╚═╝   ╚═╝    ╚═════╝╚═╝  ╚═╝╚══════╝╚═╝  ╚═╝
+# pylint: enable=line-too-long
+
+
+def _get_feeds() -> dict[str, list[int]]:
+    """Map every watched subreddit, lowercased, to the channels its posts go to"""
+    feeds = {}
+
+    for feed in BOT['reddit']['watcher']['feeds']:
+        for subreddit in feed['subreddits']:
+            feeds.setdefault(subreddit.lower(), []).append(feed['channel_id'])
+
+    return feeds
+
+
+# A single entry point, `poll`, driven by the tasks loop
+class SubredditWatcher:  # pylint: disable=too-few-public-methods
+    """Polls the watched subreddits and posts their new submissions, at most once per channel"""
+
+    def __init__(self, bot: discord.Client, db: DatabaseManager):
+        """
+        Initialize the watcher
+
+        Parameters:
+            bot (discord.Client): The bot, to resolve the channels
+            db (DatabaseManager): Connected database with the reddit.sql queries loaded
+        """
+        self.bot = bot
+        self.db = db
+
+    async def _is_posted(self, submission_id: str, channel_id: int) -> bool:
+        """Check the persisted dedupe set"""
+        return await self.db.fetchone("fetch_posted", submission_id, channel_id) is not None
+
+    async def _post(self, submission, channel_ids: list[int]):
+        """
+        Post a submission in every channel of its feeds that hasn't received it yet
+
+        Parameters:
+            submission (asyncpraw.models.Submission): The new submission
+            channel_ids (list[int]): Channels of the feeds watching its subreddit
+        """
+        submission_data = None
+
+        for channel_id in channel_ids:
+            if await self._is_posted(submission.id, channel_id):
+                continue
+
+            channel = self.bot.get_channel(channel_id)
+            if not isinstance(channel, discord.TextChannel):
+                logging.warning("-- Subreddit watcher channel %s not found", channel_id)
+                continue
+
+            submission_data = submission_data or await get_submission_data(submission)
+            await send_post_to_channel(channel=channel, submission_data=submission_data)
+            await self.db.execute("insert_posted", submission.id, channel_id, int(time.time()))
+
+            logging.info(
+                "-- Subreddit watcher posted %s from r/%s in %s",
+                submission.id,
+                submission_data['subreddit_name'],
+                channel_id
+            )
+
+    async def poll(self):
+        """
+        Fetch the submissions of every watched subreddit newer than the last one seen,
+        in one request, and post them
+
+        A set of subreddits watched for the first time only records its newest submission,
+        so adding a feed doesn't flood its channels with the backlog
+        """
+        feeds = _get_feeds()
+        if not feeds:
+            return
+
+        watcher_config = BOT['reddit']['watcher']
+        listing = "+".join(sorted(feeds))
+        row = await self.db.fetchone("fetch_newest", listing)
+        newest = row[0] if row else None
+
+        submissions = await fetch_new_submissions(
+            subreddits=sorted(feeds),
+            limit=watcher_config['limit'],
+            before=newest
+        )
+
+        if submissions and newest is None:
+            await self.db.execute("upsert_newest", listing, submissions[0].fullname)
+            logging.info("-- Subreddit watcher started following r/%s", listing)
+
+        elif submissions:
+            # --- Listed newest first, posted oldest first ---
+            for submission in reversed(submissions):
+                subreddit = submission.subreddit.display_name.lower()
+
+                # Posting is best effort, a broken submission must not block its feed
+                try:
+                    if subreddit in feeds:
+                        await self._post(submission, feeds[subreddit])
+
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    logging.error("Subreddit watcher failed to post %s.\n%s", submission.id, e)
+
+                # Saved after each post, a crash mid-way resumes after the last one
+                await self.db.execute("upsert_newest", listing, submission.fullname)
+
+        # The dedupe set only guards against a lost cursor, it only has to outlive a few polls
+        await self.db.execute(
+            "prune_posted",
+            int(time.time()) - watcher_config['dedupe_retention']
+        )
@@ -0,0 +1,311 @@
+"""
+bot/services/reddit/transcode_scheduler.py
+© by hassanpacary
+
+Bounded priority queue running FFmpeg transcodes, with cancellation and progress reporting
+"""
+
+# --- Imports ---
+import asyncio
+import itertools
+import logging
+import os
+import time
+from asyncio.subprocess import Process
+from typing import Awaitable, Callable
+
+# --- Bot modules ---
+from bot.core.config_loader import BOT
+
+
+# --- Called with the encoded ratio of the video, between 0 and 1 ---
+ProgressCallback = Callable[[float], Awaitable[None]]
+
+
+#      ██╗ ██████╗ ██████╗
+#      ██║██╔═══██╗██╔══██╗
+#      ██║██║   ██║██████╔╝
+# ██   ██║██║   ██║██╔══██╗
+# ╚█████╔╝╚██████╔╝██████╔╝
+#  ╚════╝  ╚═════╝ ╚═════╝
+
+
+class TranscodeJob:
+    """One FFmpeg command waiting in, or run by, the transcode scheduler"""
+
+    def __init__(
+            self,
+            cmd: list[str],
+            duration: float | None,
+            priority: int,
+            on_progress: ProgressCallback | None):
+        """
+        Initialize a pending job
+
+        Parameters:
+            cmd (list[str]): The FFmpeg command and its arguments
+            duration (float | None): Duration of the output in seconds, needed to report progress
+            priority (int): Jobs with the lowest priority run first, FIFO between equals
+            on_progress (ProgressCallback | None): Coroutine called with the progress ratio
+        """
+        self.cmd = cmd
+        self.duration = duration
+        self.priority = priority
+        self.on_progress = on_progress
+
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.process: Process | None = None
+        self.queued_at = time.perf_counter()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the job has been cancelled"""
+        return self.future.cancelled()
+
+    def cancel(self):
+        """Cancel the job, killing FFmpeg if it is already running"""
+        # The future is already cancelled when the task awaiting it has been cancelled
+        if not self.future.done():
+            self.future.cancel()
+
+        self.kill()
+
+    def kill(self):
+        """Kill FFmpeg if it is still running"""
+        if self.process and self.process.returncode is None:
+            try:
+                self.process.kill()
+
+            # Exited on its own and not reaped yet
+            except ProcessLookupError:
+                pass
+
+
+# ███████╗ ██████╗██╗  ██╗███████╗██████╗ ██╗   ██╗██╗     ███████╗██████╗
+# ██╔════╝██╔════╝██║  ██║██╔════╝██╔══██╗██║   ██║██║     ██╔════╝██╔══██╗
+# ███████╗██║     ███████║█████╗  ██║  ██║██║   ██║██║     █████╗  ██████╔╝
+# ╚════██║██║     ██╔══██║██╔══╝  ██║  ██║██║   ██║██║     ██╔══╝  ██╔══██╗
+# ███████║╚██████╗██║  ██║███████╗██████╔╝╚██████╔╝███████╗███████╗██║  ██║
+# ╚══════╝ ╚═════╝╚═╝  ╚═╝╚══════╝╚═════╝  ╚═════╝ ╚══════╝╚══════╝╚═╝  ╚═╝
+
+
+class TranscodeScheduler:
+    """Run FFmpeg jobs on a bounded number of workers, by priority then submission order"""
+
+    def __init__(self, workers: int | None = None):
+        """
+        Initialize the scheduler, workers are started on the first submitted job
+
+        Parameters:
+            workers (int | None): Maximum concurrent FFmpeg processes, defaults to the cpu count
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.running = 0
+
+        self._queue: asyncio.PriorityQueue | None = None
+        self._worker_tasks: list[asyncio.Task] = []
+        self._running_jobs: set[TranscodeJob] = set()
+        self._counter = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize() if self._queue else 0
+
+    def _start(self):
+        """Create the queue and the workers in the running event loop"""
+        if self._queue is not None:
+            return
+
+        self._queue = asyncio.PriorityQueue()
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"transcode-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    def submit(
+            self,
+            cmd: list[str],
+            duration: float | None = None,
+            priority: int = 0,
+            on_progress: ProgressCallback | None = None) -> TranscodeJob:
+        """
+        Queue an FFmpeg command
+
+        Parameters:
+            cmd (list[str]): The FFmpeg command and its arguments
+            duration (float | None): Duration of the output in seconds, needed to report progress
+            priority (int): Jobs with the lowest priority run first, FIFO between equals
+            on_progress (ProgressCallback | None): Coroutine called with the progress ratio
+
+        Returns:
+            TranscodeJob: The job, await `job.future` for its completion or call `job.cancel()`
+        """
+        self._start()
+
+        job = TranscodeJob(cmd=cmd, duration=duration, priority=priority, on_progress=on_progress)
+        self._queue.put_nowait((priority, next(self._counter), job))
+
+        logging.info(
+            "-- Transcode job queued (priority %d, %d waiting, %d/%d running)",
+            priority,
+            self.queued,
+            self.running,
+            self.workers
+        )
+        return job
+
+    async def run(
+            self,
+            cmd: list[str],
+            duration: float | None = None,
+            priority: int = 0,
+            on_progress: ProgressCallback | None = None):
+        """
+        Queue an FFmpeg command and wait for it, cancelling the job if the caller is cancelled
+
+        Parameters:
+            cmd (list[str]): The FFmpeg command and its arguments
+            duration (float | None): Duration of the output in seconds, needed to report progress
+            priority (int): Jobs with the lowest priority run first, FIFO between equals
+            on_progress (ProgressCallback | None): Coroutine called with the progress ratio
+        """
+        job = self.submit(cmd=cmd, duration=duration, priority=priority, on_progress=on_progress)
+
+        try:
+            await job.future
+
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+
+    # ██╗    ██╗ ██████╗ ██████╗ ██╗  ██╗███████╗██████╗
+    # ██║    ██║██╔═══██╗██╔══██╗██║ ██╔╝██╔════╝██╔══██╗
+    # ██║ █╗ ██║██║   ██║██████╔╝█████╔╝ █████╗  ██████╔╝
+    # ██║███╗██║██║   ██║██╔══██╗██╔═██╗ ██╔══╝  ██╔══██╗
+    # ╚███╔███╔╝╚██████╔╝██║  ██║██║  ██╗███████╗██║  ██║
+    #  ╚══╝╚══╝  ╚═════╝ ╚═╝  ╚═╝╚═╝  ╚═╝╚══════╝╚═╝  ╚═╝
+
+    async def _worker(self):
+        """Take jobs from the queue and run them one at a time"""
+        while True:
+            _, _, job = await self._queue.get()
+
+            try:
+                # Cancelled while it was waiting in the queue
+                if job.future.done():
+                    continue
+
+                self.running += 1
+                self._running_jobs.add(job)
+                await self._execute(job)
+
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                if not job.future.done():
+                    job.future.set_exception(e)
+
+            finally:
+                if job in self._running_jobs:
+                    self._running_jobs.discard(job)
+                    self.running -= 1
+
+                self._queue.task_done()
+
+    async def _report_progress(self, job: TranscodeJob, out_time: float):
+        """Call the job progress callback, errors are logged and never stop the transcode"""
+        try:
+            await job.on_progress(min(1.0, out_time / job.duration))
+
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.warning("Transcode progress callback failed.\n%s", e)
+
+    async def _read_progress(self, job: TranscodeJob):
+        """
+        Parse the `-progress pipe:1` output of FFmpeg and report it, rate limited
+
+        FFmpeg writes blocks of key=value lines, out_time_us is the encoded position
+        """
+        interval = BOT['media']['progress_interval']
+        last_report = time.monotonic()
+
+        async for line in job.process.stdout:
+            key, _, value = line.decode(errors="ignore").strip().partition("=")
+
+            if key != "out_time_us" or not job.on_progress or not job.duration:
+                continue
+
+            if time.monotonic() - last_report < interval:
+                continue
+
+            try:
+                out_time = int(value) / 1_000_000
+            except ValueError:
+                continue
+
+            last_report = time.monotonic()
+            await self._report_progress(job, out_time)
+
+    async def _execute(self, job: TranscodeJob):
+        """Run the FFmpeg command of a job and resolve its future"""
+        started_at = time.perf_counter()
+
+        job.process = await asyncio.create_subprocess_exec(
+            job.cmd[0], "-progress", "pipe:1", "-nostats", *job.cmd[1:],
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+
+        # Cancelled while FFmpeg was being spawned, `cancel` had no process to kill
+        if job.future.done():
+            job.kill()
+
+        # stderr is drained alongside so FFmpeg never blocks on a full pipe
+        _, stderr = await asyncio.gather(
+            self._read_progress(job),
+            job.process.stderr.read()
+        )
+        await job.process.wait()
+
+        if job.future.done():
+            logging.info("-- Transcode job cancelled")
+            return
+
+        if job.process.returncode != 0:
+            job.future.set_exception(RuntimeError(f'FFmpeg error: {stderr.decode()}'))
+            return
+
+        logging.info(
+            "-- Transcode job done in %.1fs (waited %.1fs in queue)",
+            time.perf_counter() - started_at,
+            started_at - job.queued_at
+        )
+        job.future.set_result(None)
+
+    async def shutdown(self):
+        """Cancel every queued and running job and stop the workers"""
+        if self._queue is None:
+            return
+
+        while not self._queue.empty():
+            _, _, job = self._queue.get_nowait()
+            job.cancel()
+            self._queue.task_done()
+
+        for job in list(self._running_jobs):
+            job.cancel()
+
+        for task in self._worker_tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._queue = None
+        self._worker_tasks = []
+
+
+# --- Singleton instance for global usage ---
+transcode_scheduler = TranscodeScheduler(workers=BOT['media']['transcode_workers'])
+
+
+async def transcode_shutdown():
+    """Convenience function to cancel the pending transcodes of the global scheduler"""
+    await transcode_scheduler.shutdown()
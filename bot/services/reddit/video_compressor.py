@@ -7,8 +7,11 @@ Utility functions for video downloader, mux and compression.
 
 # --- Imports ---
 import asyncio
+import functools
+import logging
+import math
 import os
-import subprocess
+import shutil
 import tempfile
 from pathlib import Path
 
@@ -16,9 +19,25 @@ from pathlib import Path
 import discord
 
 # --- Bot modules ---
+from bot.core.config_loader import BOT
+from bot.services.reddit.dash_manifest import get_manifest_url, parse_dash_manifest
+from bot.services.reddit.transcode_scheduler import transcode_scheduler, ProgressCallback
 from bot.utils.aiohttp_client import aiohttp_client
 from bot.utils.discord_utils import create_discord_file
-from bot.utils.files_utils import load_file, write_file
+from bot.utils.disk_cache import DiskCache
+from bot.utils.media_probe import probe_media
+from bot.utils.strings_utils import get_string_segment
+
+
+# --- Final videos, keyed by Reddit video id and size limit, skip all the work on re-posts ---
+@functools.cache
+def _get_video_cache() -> DiskCache:
+    """Return the cache of final videos, its directory is indexed on first use"""
+    return DiskCache(
+        name="reddit_videos",
+        directory=BOT['media']['video_cache']['directory'],
+        max_bytes=BOT['media']['video_cache']['max_bytes']
+    )
 
 
 # pylint: disable=line-too-long
@@ -31,8 +50,134 @@ from bot.utils.files_utils import load_file, write_file
 # pylint: enable=line-too-long
 
 
+def _estimate_size(rendition: dict, duration: float | None) -> int | None:
+    """Estimate the size of a rendition from its manifest bandwidth, None if unknown"""
+    if not duration or not rendition['bandwidth']:
+        return None
+
+    return int(rendition['bandwidth'] * duration / 8)
+
+
+def _split_duration(
+        duration: float,
+        filesize_limit: int,
+        audio_bitrate_bps: int) -> tuple[int, int]:
+    """
+    Decides in how many parts a video must be cut to keep a watchable bitrate under the limit
+
+    Parameters:
+        duration (float): Video duration in seconds
+        filesize_limit (int): Guild filesize limit, per part
+        audio_bitrate_bps (int): Bitrate of the audio track in bps, 0 without audio
+
+    Returns:
+        tuple[int, int]: Number of parts and the video bitrate of each part in bps
+    """
+    split = BOT['media']['split']
+    budget_bits = filesize_limit * 8
+
+    parts = 1
+    video_bitrate_bps = int(budget_bits / duration) - audio_bitrate_bps
+
+    # --- Below the quality floor, more parts give each one a higher bitrate ---
+    if video_bitrate_bps < split['min_video_bitrate']:
+        parts = math.ceil(duration * (split['min_video_bitrate'] + audio_bitrate_bps) / budget_bits)
+        parts = max(1, min(parts, split['max_parts']))
+        video_bitrate_bps = int(budget_bits * parts / duration) - audio_bitrate_bps
+
+    return parts, max(10_000, video_bitrate_bps)
+
+
+def _pick_transcode_source(
+        renditions: list[dict],
+        duration: float | None,
+        filesize_limit: int) -> dict:
+    """
+    Picks the smallest rendition still large enough for the quality ladder rung of the transcode
+
+    Parameters:
+        renditions (list[dict]): Video renditions sorted by bandwidth, highest first
+        duration (float | None): Video duration in seconds
+        filesize_limit (int): Guild filesize limit
+
+    Returns:
+        dict: The rendition to download and transcode
+    """
+    if not duration:
+        return renditions[0]
+
+    _, video_bitrate_bps = _split_duration(duration, filesize_limit, 128_000)
+    max_edge = _pick_ladder_rung(video_bitrate_bps)['max_edge']
+
+    for rendition in reversed(renditions):
+        if max(rendition['width'], rendition['height']) >= max_edge:
+            return rendition
+
+    return renditions[0]
+
+
+async def _pick_dash_rendition(url: str, filesize_limit: int) -> tuple[str, str | None]:
+    """
+    Picks the highest DASH rendition whose video and audio fit the filesize limit
+
+    Falls back to the given URL and the default audio track when the manifest is unavailable
+
+    Parameters:
+        url (str): URL of the Reddit video (fallback rendition)
+        filesize_limit (int): Guild filesize limit
+
+    Returns:
+        tuple[str, str | None]: URLs of the video and audio tracks to download,
+                                audio is None if the video has no audio track
+    """
+    default_audio_url = url.split("DASH_")[0] + "DASH_AUDIO_128.mp4"
+    manifest_url = get_manifest_url(url)
+
+    data = await aiohttp_client.download_bytes(manifest_url)
+    if not data:
+        return url, default_audio_url
+
+    try:
+        manifest = parse_dash_manifest(data, manifest_url)
+
+    except ValueError as e:
+        logging.warning("Failed to parse DASH manifest.\n%s", e)
+        return url, default_audio_url
+
+    if not manifest['video']:
+        return url, default_audio_url
+
+    audio = manifest['audio'][0] if manifest['audio'] else None
+    audio_size = (_estimate_size(audio, manifest['duration']) or 0) if audio else 0
+
+    # Bandwidths are averages, a stream copy ending up over the limit falls back to a transcode
+    for rendition in manifest['video']:
+        size = _estimate_size(rendition, manifest['duration'])
+
+        if size is not None and size + audio_size <= filesize_limit * 0.98:
+            logging.info(
+                "-- DASH rendition %dx%d fits the limit (about %d bytes): %s",
+                rendition['width'],
+                rendition['height'],
+                size + audio_size,
+                rendition['url']
+            )
+            return rendition['url'], audio['url'] if audio else None
+
+    # --- Nothing fits, download only what the transcode needs ---
+    rendition = _pick_transcode_source(manifest['video'], manifest['duration'], filesize_limit)
+    logging.info(
+        "-- No DASH rendition fits the limit, transcoding from %dx%d: %s",
+        rendition['width'],
+        rendition['height'],
+        rendition['url']
+    )
+    return rendition['url'], audio['url'] if audio else None
+
+
 async def _download_video_and_audio_source(
-        url: str,
+        video_url: str,
+        audio_url: str | None,
         tmpdir: str,
         filename: str
 ) -> tuple[str, str | None]:
@@ -40,7 +185,8 @@ async def _download_video_and_audio_source(
     Downloads the Reddit video and optional audio to temporary files
 
     Parameters:
-        url (str): URL of the Reddit video
+        video_url (str): URL of the video track
+        audio_url (str | None): URL of the audio track, None if the video has no audio
         tmpdir (str): Path to a temporary directory for intermediate files
         filename (str): Base filename to use for saved files
 
@@ -51,56 +197,41 @@ async def _download_video_and_audio_source(
     tmp_video_path = os.path.join(tmpdir, filename + "_video.mp4")
     tmp_audio_path = os.path.join(tmpdir, filename + "_audio.mp4")
 
-    video_data = await aiohttp_client.download_bytes(url)
-    write_file(tmp_video_path, video_data)
+    # Both tracks come from the same CDN and are independent, stream them to disk concurrently.
+    # A video without audio answers 403/404, its body is never read
+    video_downloaded, audio_downloaded = await asyncio.gather(
+        aiohttp_client.download_to_file(video_url, tmp_video_path),
+        aiohttp_client.download_to_file(audio_url, tmp_audio_path, segments=1)
+        if audio_url else asyncio.sleep(0, result=False)
+    )
 
-    audio_data = await aiohttp_client.download_bytes(url.split("DASH_")[0] + "DASH_AUDIO_128.mp4")
+    if not video_downloaded:
+        raise RuntimeError(f"Failed to download Reddit video: {video_url}")
 
-    # --- Audio exist ---
-    if audio_data:
-        write_file(tmp_audio_path, audio_data)
-    else:
+    # --- Audio doesn't exist ---
+    if not audio_downloaded:
+        logging.info("-- Reddit video has no audio track: %s", video_url)
         tmp_audio_path = None
 
     return tmp_video_path, tmp_audio_path
 
 
-async def _merge_video_audio_in_one_file(
-        video_path: str,
-        audio_path: str | None,
-        output_path: str):
+async def _run_ffmpeg(cmd: list[str]):
     """
-    Merges video and optional audio into a single .mp4 file using FFmpeg
+    Runs an FFmpeg command without blocking the event loop
 
     Parameters:
-        video_path (str): Path to the video file
-        audio_path (str | None): Path to the audio file, or None if no audio
-        output_path (str): Path for the merged output file
+        cmd (list[str]): The FFmpeg command and its arguments
     """
-    merge_cmd = ["ffmpeg", "-y", "-i", video_path]
-
-    if audio_path:
-        merge_cmd += [
-            "-i", audio_path,
-            "-c:v", "copy",
-            "-c:a", "aac",
-            "-map", "0:v:0",
-            "-map", "1:a:0"
-        ]
-    else:
-        merge_cmd += ["-c:v", "copy"]
-
-    merge_cmd.append(output_path)
-
     process = await asyncio.create_subprocess_exec(
-        *merge_cmd,
+        *cmd,
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE
     )
     _, stderr = await process.communicate()
 
     if process.returncode != 0:
-        raise RuntimeError(f'FFmpeg merge error: {stderr.decode()}')
+        raise RuntimeError(f'FFmpeg error: {stderr.decode()}')
 
 
 # pylint: disable=line-too-long
@@ -113,75 +244,165 @@ async def _merge_video_audio_in_one_file(
 # pylint: enable=line-too-long
 
 
-def _get_video_duration(video_path: str) -> float:
+def _pick_ladder_rung(video_bitrate_bps: int) -> dict:
     """
-    Retrieves the duration of a video file using ffprobe
+    Picks the highest rung of the quality ladder the target bitrate can afford
 
     Parameters:
-        video_path (str): Path to the video file
+        video_bitrate_bps (int): Target video bitrate in bps
 
     Returns:
-        float: Video duration in seconds
-    """
-    result = subprocess.run(
-        [
-            "ffprobe",
-            "-v", "error",
-            "-select_streams", "v:0",
-            "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            video_path
-        ],
-        capture_output=True, text=True, check=True
-    )
+        dict: Rung with min_bitrate, max_edge (longest side in px) and max_fps
+    """
+    ladder = BOT['media']['ladder']
 
-    try:
-        return float(result.stdout.strip())
+    for rung in ladder:
+        if video_bitrate_bps >= rung['min_bitrate']:
+            return rung
 
-    except ValueError as e:
-        raise RuntimeError(f"Failed to parse video duration: {result.stdout}") from e
+    return ladder[-1]
 
 
-async def _compress_video(
-        input_path: str,
-        output_path: str,
-        filesize_limit: int):
+def _pick_preset() -> str:
     """
-    Compresses a video using FFmpeg to a target bitrate and scales to 1280px width
+    Picks the x264 preset from the transcode scheduler load
+
+    Returns:
+        str: Slower preset when idle, faster ones as the queue gets deeper
+    """
+    presets = BOT['media']['presets']
+    load = transcode_scheduler.queued + transcode_scheduler.running
+
+    if load == 0:
+        return presets['idle']
+
+    if load < transcode_scheduler.workers:
+        return presets['busy']
+
+    return presets['saturated']
+
+
+async def _get_transcode_plan(
+        video_path: str,
+        audio_path: str | None,
+        filesize_limit: int,
+        force_transcode: bool = False) -> dict | None:
+    """
+    Decides up front, from the sources, whether the tracks can be stream-copied or need a transcode
 
     Parameters:
-        input_path (str): Path to the input video
-        output_path (str): Path for the compressed output
+        video_path (str): Path to the video file
+        audio_path (str | None): Path to the audio file, or None if no audio
         filesize_limit (int): Guild filesize limit
-    """
-    # Calcul the target video bitrate
-    duration = _get_video_duration(video_path=input_path)
-    audio_bitrate_bps = 128_000
-    target_total_bitrate_bps = int((filesize_limit * 8) / duration)
-    target_video_bitrate_bps = max(10_000, target_total_bitrate_bps - audio_bitrate_bps)
-
-    compress_cmd = [
-        "ffmpeg",
-        "-y",
-        "-i", input_path,
-        "-c:v", "libx264",
-        "-b:v", str(int(target_video_bitrate_bps)),
-        "-preset", "fast",
-        "-vf", "scale=1280:-2",
-        "-c:a", "aac",
-        "-b:a", "128k",
-        output_path
-    ]
+        force_transcode (bool): Skip the stream copy estimate, when its output didn't fit
 
-    compress_process = await asyncio.create_subprocess_exec(
-        *compress_cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
+    Returns:
+        dict | None: Encoding settings (video_bitrate, duration, parts, max_edge, fps, preset),
+                     or None if a stream copy fits the limit
+    """
+    sources_size = os.path.getsize(video_path) + (os.path.getsize(audio_path) if audio_path else 0)
+
+    # --- Stream copy only adds a few KB of container overhead ---
+    if not force_transcode and sources_size <= filesize_limit * 0.98:
+        return None
+
+    probe = await probe_media(video_path)
+    duration = probe['duration']
+    if not duration:
+        raise RuntimeError(f"Failed to get video duration: {video_path}")
+
+    # Calcul the target video bitrate, splitting the video when it would be unwatchable
+    audio_bitrate_bps = 128_000 if audio_path else 0
+    parts, video_bitrate_bps = _split_duration(duration, filesize_limit, audio_bitrate_bps)
+
+    # --- Lower bitrates look better with fewer pixels and frames to spend them on ---
+    rung = _pick_ladder_rung(video_bitrate_bps)
+    source_fps = (probe['video'] or {}).get("fps")
+
+    plan = {
+        "video_bitrate": video_bitrate_bps,
+        "duration": duration,
+        "parts": parts,
+        "max_edge": rung['max_edge'],
+        "fps": rung['max_fps'] if source_fps and source_fps > rung['max_fps'] else None,
+        "preset": _pick_preset()
+    }
+
+    logging.info(
+        "-- Transcode ladder: %.1fs in %d part(s) at %d kbps -> max edge %dpx, "
+        "fps %s (source %s), preset %s (queued %d, running %d/%d)",
+        duration,
+        parts,
+        video_bitrate_bps // 1000,
+        plan['max_edge'],
+        plan['fps'] or "unchanged",
+        source_fps,
+        plan['preset'],
+        transcode_scheduler.queued,
+        transcode_scheduler.running,
+        transcode_scheduler.workers
     )
-    _, compress_stderr = await compress_process.communicate()
+    return plan
+
+
+def _build_ffmpeg_command(
+        video_path: str,
+        audio_path: str | None,
+        output_path: str,
+        plan: dict | None,
+        part: int = 0) -> list[str]:
+    """
+    Builds the single FFmpeg command producing the final video, or one of its parts,
+    from the downloaded tracks
+
+    Parameters:
+        video_path (str): Path to the video file
+        audio_path (str | None): Path to the audio file, or None if no audio
+        output_path (str): Path for the final output file
+        plan (dict | None): Encoding settings from `_get_transcode_plan`, None to stream-copy
+        part (int): Index of the part to encode when the plan splits the video
+
+    Returns:
+        list[str]: The FFmpeg command
+    """
+    # Input seeking on a re-encode is frame accurate and each part starts on a keyframe
+    trim = []
+    if plan is not None and plan['parts'] > 1:
+        part_duration = plan['duration'] / plan['parts']
+        trim = ["-ss", f"{part * part_duration:.3f}", "-t", f"{part_duration:.3f}"]
+
+    cmd = ["ffmpeg", "-y", *trim, "-i", video_path]
+
+    if audio_path:
+        cmd += [*trim, "-i", audio_path, "-map", "0:v:0", "-map", "1:a:0"]
+    else:
+        cmd += ["-map", "0:v:0"]
 
-    if compress_process.returncode != 0:
-        raise RuntimeError(f'FFmpeg compress error: {compress_stderr.decode()}')
+    # --- Mux only ---
+    if plan is None:
+        cmd += ["-c", "copy"]
+
+    # --- Mux and fit the longest side and the frame rate to the target bitrate ---
+    else:
+        max_edge = plan['max_edge']
+        filters = [
+            f"scale='min(iw,{max_edge})':'min(ih,{max_edge})'"
+            ":force_original_aspect_ratio=decrease:force_divisible_by=2"
+        ]
+        if plan['fps']:
+            filters.append(f"fps={plan['fps']}")
+
+        cmd += [
+            "-c:v", "libx264",
+            "-b:v", str(int(plan['video_bitrate'])),
+            "-preset", plan['preset'],
+            "-vf", ",".join(filters),
+            "-c:a", "aac",
+            "-b:a", "128k"
+        ]
+
+    cmd += ["-movflags", "+faststart", output_path]
+    return cmd
 
 
 # ███████╗██╗███╗   ██╗ █████╗ ██╗         ██╗   ██╗██╗██████╗ ███████╗ ██████╗
@@ -192,52 +413,335 @@ async def _compress_video(
 # ╚═╝     ╚═╝╚═╝  ╚═══╝╚═╝  ╚═╝╚══════╝      ╚═══╝  ╚═╝╚═════╝ ╚══════╝ ╚═════╝
 
 
-async def get_video(
+def _get_cache_keys(url: str, file_size_limit: int, parts: int) -> list[str]:
+    """Build the cache keys of the outputs of a video, one per part"""
+    video_id = get_string_segment(string=url, split_char="/", i=1)
+    limit = f"{file_size_limit // (1024 * 1024)}mib"
+
+    if parts == 1:
+        return [DiskCache.make_key(video_id, f"{limit}.mp4")]
+
+    return [
+        DiskCache.make_key(video_id, limit, f"part{part + 1}of{parts}.mp4")
+        for part in range(parts)
+    ]
+
+
+def _get_cached_outputs(url: str, file_size_limit: int) -> list[str] | None:
+    """
+    Look up the outputs of a video already processed for this size limit
+
+    Parameters:
+        url (str): URL of the Reddit video
+        file_size_limit (int): Maximum allowed file size in bytes
+
+    Returns:
+        list[str] | None: Paths of the cached parts in order, None unless all of them are cached
+    """
+    single_path = _get_video_cache().get(_get_cache_keys(url, file_size_limit, 1)[0])
+    if single_path:
+        return [single_path]
+
+    for parts in range(2, BOT['media']['split']['max_parts'] + 1):
+        keys = _get_cache_keys(url, file_size_limit, parts)
+
+        if keys[0] in _get_video_cache():
+            paths = [_get_video_cache().get(key) for key in keys]
+            return paths if all(paths) else None
+
+    return None
+
+
+async def _open_outputs(
+        paths: list[str],
+        filename: str,
+        tmpdir: str | None = None) -> list[discord.File]:
+    """
+    Open the output files for upload, numbering the filenames of a split video
+
+    Parameters:
+        paths (list[str]): Paths of the outputs, cached or in tmpdir
+        filename (str): Filename of the video
+        tmpdir (str | None): Temporary directory of the outputs the cache couldn't take,
+                             they are deleted once uploaded and the directory with the last one
+
+    Returns:
+        list[discord.File]: The files to upload, in order
+    """
+    stem, suffix = Path(filename).stem, Path(filename).suffix
+    files = []
+
+    try:
+        for part, path in enumerate(paths):
+            files.append(await create_discord_file(
+                filename=filename if len(paths) == 1 else f"{stem}_part{part + 1}{suffix}",
+                data=path,
+                temp_dir=tmpdir if tmpdir and Path(path).parent == Path(tmpdir) else None
+            ))
+
+    except OSError:
+        for file in files:
+            file.close()
+        raise
+
+    return files
+
+
+async def _transcode_parts( # pylint: disable=too-many-arguments
+        video_path: str,
+        audio_path: str | None,
+        output_paths: list[str],
+        plan: dict,
+        *,
+        priority: int,
+        on_progress: ProgressCallback | None) -> None:
+    """
+    Transcodes every part of a video in parallel on the transcode scheduler
+
+    Parameters:
+        video_path (str): Path to the video file
+        audio_path (str | None): Path to the audio file, or None if no audio
+        output_paths (list[str]): Path of each output part
+        plan (dict): Encoding settings from `_get_transcode_plan`
+        priority (int): Priority of the transcode jobs, lowest runs first
+        on_progress (ProgressCallback | None): Coroutine called with the overall progress ratio
+    """
+    part_duration = plan['duration'] / plan['parts']
+    ratios = [0.0] * plan['parts']
+    last_report = [0.0]
+
+    def part_progress(part: int) -> ProgressCallback | None:
+        """Build the progress callback of one part, reporting the average of all parts"""
+        if on_progress is None:
+            return None
+
+        async def report(ratio: float):
+            ratios[part] = ratio
+
+            # Every running part reports, forward at most once per interval
+            now = asyncio.get_running_loop().time()
+            if now - last_report[0] >= BOT['media']['progress_interval']:
+                last_report[0] = now
+                await on_progress(sum(ratios) / len(ratios))
+
+        return report
+
+    tasks = [
+        asyncio.create_task(transcode_scheduler.run(
+            cmd=_build_ffmpeg_command(
+                video_path=video_path,
+                audio_path=audio_path,
+                output_path=output_path,
+                plan=plan,
+                part=part
+            ),
+            duration=part_duration,
+            priority=priority,
+            on_progress=part_progress(part)
+        ))
+        for part, output_path in enumerate(output_paths)
+    ]
+
+    try:
+        await asyncio.gather(*tasks)
+
+    finally:
+        # A failed part cancels the others, the scheduler kills their FFmpeg processes
+        for task in tasks:
+            task.cancel()
+
+
+async def get_video( # pylint: disable=too-many-locals
         url: str,
         filename: str,
-        file_size_limit: int) -> discord.File | None:
+        file_size_limit: int,
+        priority: int = 0,
+        on_progress: ProgressCallback | None = None) -> list[discord.File]:
     """
-    Downloads, merges, and compresses a Reddit video to fit under a file size limit
+    Downloads a Reddit video and produces files under a file size limit with a single FFmpeg run
+    per file, outputs are kept in an on-disk cache
+
+    The highest DASH rendition fitting the limit is downloaded and its tracks stream-copied.
+    When none fits, they are muxed and transcoded in the same pass,
+    queued on the transcode scheduler.
+    When fitting the limit would starve the bitrate below the configured floor,
+    the video is cut into parts transcoded in parallel.
+    The outputs are streamed from disk to Discord
 
     Parameters:
         url (str): URL of the Reddit video
         filename (str): Base filename without extension
-        file_size_limit (int): Maximum allowed file size in bytes
+        file_size_limit (int): Maximum allowed file size in bytes, per part
+        priority (int): Priority of the transcode job, lowest runs first
+        on_progress (ProgressCallback | None): Coroutine called with the transcode progress ratio
 
     Returns:
-        discord.File | None: Discord file object with the merged/compressed video
-                             or None if something fails
+        list[discord.File]: Discord file objects with the merged/compressed video, in order.
+                            A single file unless the video has been split
     """
     filename_without_ext = Path(filename).stem
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmp_out_path = os.path.join(tmpdir, filename_without_ext + "_merged.mp4")
+    # --- Already processed for this size limit ---
+    cached_paths = _get_cached_outputs(url, file_size_limit)
+
+    if cached_paths:
+        logging.info("-- Reddit video served from cache in %d part(s): %s", len(cached_paths), url)
+        return await _open_outputs(cached_paths, filename)
+
+    # Removed with the last upload, or right away when every output ends up in the cache
+    tmpdir = tempfile.mkdtemp()
+
+    try:
+        tmp_out_path = os.path.join(tmpdir, filename_without_ext + "_output.mp4")
+
+        video_url, audio_url = await _pick_dash_rendition(url=url, filesize_limit=file_size_limit)
 
         video_path, audio_path = await _download_video_and_audio_source(
-            url=url,
+            video_url=video_url,
+            audio_url=audio_url,
             tmpdir=tmpdir,
             filename=filename
         )
 
-        await _merge_video_audio_in_one_file(
+        transcode_plan = await _get_transcode_plan(
             video_path=video_path,
             audio_path=audio_path,
-            output_path=tmp_out_path
+            filesize_limit=file_size_limit
         )
 
-        # --- Return video if under filesize limit ---
-        if os.path.getsize(tmp_out_path) <= file_size_limit:
-            video = load_file(file_path=tmp_out_path, mode="rb")
-            return await create_discord_file(data=video, filename=filename)
+        # --- Stream copy is cheap, no need to wait for a transcode worker ---
+        if transcode_plan is None:
+            await _run_ffmpeg(_build_ffmpeg_command(
+                video_path=video_path,
+                audio_path=audio_path,
+                output_path=tmp_out_path,
+                plan=None
+            ))
+
+            # The plan only estimated the container overhead, the muxed file must really fit
+            if os.path.getsize(tmp_out_path) > file_size_limit:
+                logging.info("-- Stream copy over the limit, falling back to a transcode: %s", url)
+                os.remove(tmp_out_path)
+
+                transcode_plan = await _get_transcode_plan(
+                    video_path=video_path,
+                    audio_path=audio_path,
+                    filesize_limit=file_size_limit,
+                    force_transcode=True
+                )
+
+        parts = transcode_plan['parts'] if transcode_plan else 1
+        output_paths = [tmp_out_path] if parts == 1 else [
+            os.path.join(tmpdir, f"{filename_without_ext}_output_{part + 1}.mp4")
+            for part in range(parts)
+        ]
 
-        # --- Otherwise compress video ---
-        tmp_compressed_path = os.path.join(tmpdir, filename_without_ext + "_compressed.mp4")
+        # --- Transcode ---
+        if transcode_plan and parts == 1:
+            await transcode_scheduler.run(
+                cmd=_build_ffmpeg_command(
+                    video_path=video_path,
+                    audio_path=audio_path,
+                    output_path=tmp_out_path,
+                    plan=transcode_plan
+                ),
+                duration=transcode_plan['duration'],
+                priority=priority,
+                on_progress=on_progress
+            )
+
+        # --- Transcode the parts in parallel ---
+        elif transcode_plan:
+            await _transcode_parts(
+                video_path=video_path,
+                audio_path=audio_path,
+                output_paths=output_paths,
+                plan=transcode_plan,
+                priority=priority,
+                on_progress=on_progress
+            )
+
+        keys = _get_cache_keys(url, file_size_limit, parts)
+        video_cache = _get_video_cache()
+        cached_paths = [await video_cache.put(key, path) for key, path in zip(keys, output_paths)]
+        output_paths = [cached or path for cached, path in zip(cached_paths, output_paths)]
+
+        # --- Only the outputs to upload from the temporary directory are kept ---
+        for entry in os.listdir(tmpdir):
+            path = os.path.join(tmpdir, entry)
+            if path not in output_paths:
+                os.remove(path)
+
+        if all(cached_paths):
+            os.rmdir(tmpdir)
+
+        return await _open_outputs(output_paths, filename, tmpdir)
+
+    except BaseException:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        raise
+
+
+#  ██████╗ ██╗███████╗    ████████╗ ██████╗     ███╗   ███╗██████╗ ██╗  ██╗
+# ██╔════╝ ██║██╔════╝    ╚══██╔══╝██╔═══██╗    ████╗ ████║██╔══██╗██║  ██║
+# ██║  ███╗██║█████╗         ██║   ██║   ██║    ██╔████╔██║██████╔╝███████║
+# ██║   ██║██║██╔══╝         ██║   ██║   ██║    ██║╚██╔╝██║██╔═══╝ ╚════██║
+# ╚██████╔╝██║██║            ██║   ╚██████╔╝    ██║ ╚═╝ ██║██║          ██║
+#  ╚═════╝ ╚═╝╚═╝            ╚═╝    ╚═════╝     ╚═╝     ╚═╝╚═╝          ╚═╝
+
+
+async def convert_gif_to_mp4(
+        data: bytes,
+        filename: str,
+        max_size: int,
+        priority: int = 0) -> tuple[bytes, str] | None:
+    """
+    Converts an animated GIF to an H.264 MP4, queued on the transcode scheduler
 
-        await _compress_video(
-            input_path=tmp_out_path,
-            output_path=tmp_compressed_path,
-            filesize_limit=file_size_limit
-        )
+    Parameters:
+        data (bytes): Raw GIF data
+        filename (str): Original filename, its extension is replaced by .mp4
+        max_size (int): Maximum size of the output in bytes
+        priority (int): Priority of the transcode job, lowest runs first
+
+    Returns:
+        tuple[bytes, str] | None: The MP4 data and its filename,
+                                  or None if the conversion failed or doesn't help
+    """
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmpdir:
+        gif_path = os.path.join(tmpdir, "input.gif")
+        mp4_path = os.path.join(tmpdir, "output.mp4")
+
+        await asyncio.to_thread(Path(gif_path).write_bytes, data)
+
+        # yuv420p with even dimensions is what every player decodes
+        cmd = [
+            "ffmpeg", "-y", "-i", gif_path,
+            "-c:v", "libx264",
+            "-crf", str(BOT['media']['gif_crf']),
+            "-preset", _pick_preset(),
+            "-pix_fmt", "yuv420p",
+            "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2",
+            "-movflags", "+faststart",
+            mp4_path
+        ]
 
-        compressed_video = load_file(file_path=tmp_compressed_path, mode="rb")
-        return await create_discord_file(data=compressed_video, filename=filename)
+        try:
+            await transcode_scheduler.run(cmd=cmd, priority=priority)
+
+        except RuntimeError as e:
+            logging.warning("Failed to convert GIF %s to MP4.\n%s", filename, e)
+            return None
+
+        mp4 = await asyncio.to_thread(Path(mp4_path).read_bytes)
+
+    if len(mp4) >= len(data) or len(mp4) > max_size:
+        return None
+
+    logging.info(
+        "-- GIF %s converted to MP4 from %d to %d bytes",
+        filename,
+        len(data),
+        len(mp4)
+    )
+    return mp4, Path(filename).stem + ".mp4"
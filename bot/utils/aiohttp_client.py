@@ -6,12 +6,18 @@ Reusable asynchronous HTTP client for the Bot using aiohttp
 """
 
 # --- Imports ---
+import asyncio
 import logging
+import os
 from typing import Optional, Dict, Any
 
 # --- Third party imports ---
 import aiohttp
 
+# --- Bot modules ---
+from bot.core.config_loader import BOT
+from bot.utils.http_metrics import http_metrics
+
 
 # ██╗  ██╗████████╗████████╗██████╗      ██████╗██╗     ██╗███████╗███╗   ██╗████████╗
 # ██║  ██║╚══██╔══╝╚══██╔══╝██╔══██╗    ██╔════╝██║     ██║██╔════╝████╗  ██║╚══██╔══╝
@@ -26,24 +32,39 @@ class AioHttpClient:
 
     _session: Optional[aiohttp.ClientSession] = None
 
+    # Size of the chunks read when streaming a response into a file
+    CHUNK_SIZE = 256 * 1024
+
     def __init__(self, headers: Optional[Dict[str, str]] = None, timeout: int = 10):
         """Initialize the HTTP client with optional default headers and timeout"""
         self._headers = headers or {}
         self._timeout = aiohttp.ClientTimeout(total=timeout)
 
+        # Large files can't be downloaded in `timeout` seconds, only stalled reads are aborted
+        self._download_timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=timeout,
+            sock_read=timeout
+        )
+
     @property
     def session(self) -> aiohttp.ClientSession:
         """
         Return the singleton aiohttp.ClientSession
 
         If the session does not exist or is closed, creates a new one
-        using the default headers and timeout
+        using the default headers and timeout. Every request made through
+        the session is traced into `http_metrics`
 
         Returns:
             aiohttp.ClientSession: The active client session
         """
         if not self._session or self._session.closed:
-            self._session = aiohttp.ClientSession(headers=self._headers, timeout=self._timeout)
+            self._session = aiohttp.ClientSession(
+                headers=self._headers,
+                timeout=self._timeout,
+                trace_configs=[http_metrics.trace_config(pool="aiohttp_client")]
+            )
 
         return self._session
 
@@ -161,6 +182,167 @@ class AioHttpClient:
             )
             return None
 
+    async def _get_ranges_length(self, url: str) -> int | None:
+        """
+        Check whether the server accepts byte ranges for a given URL
+
+        Parameters:
+            url (str): The URL to check
+
+        Returns:
+            int | None: The content length if byte ranges are supported, None otherwise
+        """
+        try:
+            async with self.session.head(url, allow_redirects=True) as resp:
+                if resp.status != 200 or resp.headers.get("Accept-Ranges", "").lower() != "bytes":
+                    return None
+
+                return resp.content_length
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.warning("HEAD request failed: %s.\n%s", url, e)
+            return None
+
+    async def _download_range(self, url: str, file_path: str, start: int, end: int) -> bool:
+        """
+        Download the bytes [start, end] of a URL into a preallocated file at the same offset
+
+        Parameters:
+            url (str): The URL to download
+            file_path (str): Path of the preallocated file
+            start (int): First byte of the range
+            end (int): Last byte of the range (inclusive)
+
+        Returns:
+            bool: True if the whole range has been written, False otherwise
+        """
+        headers = {"Range": f"bytes={start}-{end}"}
+
+        async with self.session.get(url, headers=headers, timeout=self._download_timeout) as resp:
+            if resp.status != 206:
+                logging.warning(
+                    "Range request refused by %s (status %s)",
+                    url,
+                    resp.status
+                )
+                return False
+
+            with open(file_path, "r+b") as f:
+                f.seek(start)
+                async for chunk in resp.content.iter_chunked(self.CHUNK_SIZE):
+                    f.write(chunk)
+
+                return f.tell() == end + 1
+
+    async def _download_stream(self, url: str, file_path: str) -> bool:
+        """
+        Download a URL over a single connection, streaming it into a file
+
+        Parameters:
+            url (str): The URL to download
+            file_path (str): Path of the file to write
+
+        Returns:
+            bool: True if the download succeeded, False otherwise
+        """
+        async with self.session.get(url, timeout=self._download_timeout) as resp:
+            if resp.status != 200:
+                logging.warning(
+                    "Failed to download file from %s (status %s)",
+                    url,
+                    resp.status
+                )
+                return False
+
+            with open(file_path, "wb") as f:
+                async for chunk in resp.content.iter_chunked(self.CHUNK_SIZE):
+                    f.write(chunk)
+
+            return True
+
+    async def download_to_file(self, url: str, file_path: str, segments: int = None) -> bool:
+        """
+        Download a URL straight into a file
+
+        When the server advertises `Accept-Ranges: bytes` and the file is large enough,
+        the file is preallocated and N byte ranges are fetched concurrently.
+        Otherwise, or if any range fails, it falls back to a single stream
+
+        Parameters:
+            url (str): The URL to download
+            file_path (str): Path of the file to write
+            segments (int): Maximum number of concurrent ranges (defaults to bot.json config)
+
+        Returns:
+            bool: True if the file has been fully downloaded, False otherwise
+        """
+        segments = segments or BOT['http']['download_segments']
+        segment_min_size = BOT['http']['segment_min_size']
+
+        try:
+            length = await self._get_ranges_length(url) if segments > 1 else None
+
+            # --- Not worth splitting, or ranges not supported ---
+            if not length or length < 2 * segment_min_size:
+                return await self._download_stream(url, file_path)
+
+            # --- Preallocate the file and fetch ranges concurrently ---
+            segments = min(segments, length // segment_min_size)
+            segment_size = -(-length // segments)
+
+            with open(file_path, "wb") as f:
+                f.truncate(length)
+
+            tasks = [
+                asyncio.create_task(self._download_range(
+                    url,
+                    file_path,
+                    start,
+                    min(start + segment_size, length) - 1
+                ))
+                for start in range(0, length, segment_size)
+            ]
+            completed = True
+
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    try:
+                        completed = await next_done
+
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        logging.warning("Range request failed: %s.\n%s", url, e)
+                        completed = False
+
+                    if not completed:
+                        break
+
+            finally:
+                # The first failed range stops the others, none writes into the file afterwards
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            if completed:
+                logging.info(
+                    "Downloaded %s in %d segments (%d bytes)",
+                    url,
+                    segments,
+                    length
+                )
+                return True
+
+            logging.warning("Segmented download failed, falling back to a single stream: %s", url)
+            os.remove(file_path)
+            return await self._download_stream(url, file_path)
+
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            logging.error(
+                "Download request failed: %s.\n%s",
+                url,
+                e
+            )
+            return False
+
     async def close(self):
         """Close the aiohttp.ClientSession cleanly"""
         if self._session and not self._session.closed:
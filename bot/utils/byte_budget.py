@@ -0,0 +1,163 @@
+"""
+bot/utils/byte_budget.py
+© by hassanpacary
+
+Process-wide budget of the media bytes held in memory, shared by every reply
+"""
+
+# --- Imports ---
+import asyncio
+import time
+from collections import deque
+
+# --- Bot modules ---
+from bot.core.config_loader import BOT
+from bot.utils.http_metrics import LatencyHistogram
+
+
+# ██████╗ ██╗   ██╗████████╗███████╗    ██████╗ ██╗   ██╗██████╗  ██████╗ ███████╗████████╗
+# ██╔══██╗╚██╗ ██╔╝╚══██╔══╝██╔════╝    ██╔══██╗██║   ██║██╔══██╗██╔════╝ ██╔════╝╚══██╔══╝
+# ██████╔╝ ╚████╔╝    ██║   █████╗      ██████╔╝██║   ██║██║  ██║██║  ███╗█████╗     ██║
+# ██╔══██╗  ╚██╔╝     ██║   ██╔══╝      ██╔══██╗██║   ██║██║  ██║██║   ██║██╔══╝     ██║
+# ██████╔╝   ██║      ██║   ███████╗    ██████╔╝╚██████╔╝██████╔╝╚██████╔╝███████╗   ██║
+# ╚═════╝    ╚═╝      ╚═╝   ╚══════╝    ╚═════╝  ╚═════╝ ╚═════╝  ╚═════╝ ╚══════╝   ╚═╝
+
+
+class ByteBudget:
+    """
+    Async semaphore counting bytes instead of slots
+
+    Work reserves bytes before loading a payload and settles them to its real size once known.
+    Reservations wait while they don't fit in the budget, in arrival order.
+    A reservation larger than the whole budget is let in once the budget is empty
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Initialize an empty budget
+
+        Parameters:
+            max_bytes (int): Bytes reservations must fit in
+        """
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.peak = 0
+        self.waits = 0
+        self.wait_time = LatencyHistogram()
+        self._waiters: deque[tuple[asyncio.Future, int]] = deque()
+
+    def _fits(self, size: int) -> bool:
+        """Whether size bytes can be reserved right away"""
+        return self.used == 0 or self.used + size <= self.max_bytes
+
+    def _wake(self):
+        """Reserve the bytes of the oldest waiters while they fit"""
+        while self._waiters:
+            waiter, size = self._waiters[0]
+
+            if waiter.done():
+                self._waiters.popleft()
+                continue
+
+            if not self._fits(size):
+                return
+
+            self._waiters.popleft()
+            self.charge(size)
+            waiter.set_result(None)
+
+    def try_acquire(self, size: int) -> bool:
+        """
+        Reserve size bytes if they fit right away and nobody is waiting
+
+        Parameters:
+            size (int): Bytes to reserve
+
+        Returns:
+            bool: Whether the bytes have been reserved
+        """
+        if self._waiters or not self._fits(size):
+            return False
+
+        self.charge(size)
+        return True
+
+    async def acquire(self, size: int):
+        """
+        Wait until size bytes fit in the budget, then reserve them
+
+        Only wait while holding nothing from the budget,
+        replies waiting on each other's bytes would never release them
+
+        Parameters:
+            size (int): Bytes to reserve
+        """
+        if self.try_acquire(size):
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append((waiter, size))
+        self.waits += 1
+        start = time.perf_counter()
+
+        try:
+            await waiter
+
+        except asyncio.CancelledError:
+            # Reserved right as it was cancelled, the bytes go to the next waiters
+            if waiter.done() and not waiter.cancelled():
+                self.release(size)
+            else:
+                self._wake()
+            raise
+
+        finally:
+            self.wait_time.observe(time.perf_counter() - start)
+
+    def charge(self, size: int):
+        """
+        Count bytes now held in memory, without waiting
+
+        Parameters:
+            size (int): Bytes to add to the usage
+        """
+        self.used += size
+        self.peak = max(self.peak, self.used)
+
+    def release(self, size: int):
+        """
+        Give back bytes that are no longer held
+
+        Parameters:
+            size (int): Bytes to remove from the usage
+        """
+        self.used -= size
+        self._wake()
+
+    def settle(self, reserved: int, size: int):
+        """
+        Replace a reservation with the real size of what it was made for
+
+        Parameters:
+            reserved (int): Bytes reserved
+            size (int): Bytes actually held, 0 when nothing was loaded
+        """
+        if size > reserved:
+            self.charge(size - reserved)
+        else:
+            self.release(reserved - size)
+
+    def stats(self) -> dict:
+        """Return a JSON serializable view of the budget"""
+        return {
+            "max_bytes": self.max_bytes,
+            "used": self.used,
+            "peak": self.peak,
+            "waiting": sum(not waiter.done() for waiter, _ in self._waiters),
+            "waits": self.waits,
+            "wait_time": self.wait_time.snapshot()
+        }
+
+
+# --- Singleton instance for global usage ---
+media_budget = ByteBudget(max_bytes=BOT['media']['memory_budget'])
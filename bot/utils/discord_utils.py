@@ -9,6 +9,7 @@ Utility functions for discord.
 from datetime import datetime
 import io
 import logging
+import os
 
 # --- Third party imports ---
 import discord
@@ -29,59 +30,78 @@ from bot.utils.strings_utils import get_string_segment
 
 async def send_response_to_discord( # pylint: disable=too-many-arguments
         *,
-        ctx: discord.Interaction | discord.Message,
+        ctx: discord.Interaction | discord.Message | discord.TextChannel,
         content: str = None,
         files: list[discord.File] = None,
         embed: discord.Embed = None,
         view: discord.ui.View = None,
         ephemeral: bool = False,
         detach: bool = False
-):
+) -> discord.Message | None:
     """
-    Send a response to either a Discord Message or an Interaction
+    Send a response to a Discord Message or an Interaction, or a message in a channel
 
     Parameters:
-        ctx (discord.Message | Interaction): The message or interaction to respond to
+        ctx (discord.Message | Interaction | TextChannel): The message, interaction or channel
         content (str): The message text (optional)
         files (list[discord.File]): The files to send
         embed (discord.Embed): The embed to send
         view (discord.View): The view to use
         ephemeral (bool): Whether the response should be ephemeral (only works with interactions)
         detach (bool): Whether the response should be detached (only works with interactions)
+
+    Returns:
+        discord.Message | None: The sent message, None if Discord didn't return it
     """
     if files is None:
         files = []
 
+    message = None
+
     # --- Response to Slash command ---
     if isinstance(ctx, discord.Interaction):
 
         # If flag detach is true, send a simple message in the channel
         if detach:
-            await ctx.channel.send(content=content, files=files, embed=embed, view=view)
+            message = await ctx.channel.send(content=content, files=files, embed=embed, view=view)
 
         # 2nd and all new response in the ctx
         elif ctx.response.is_done():  # type: ignore
-            await ctx.followup.send(content=content, files=files, embed=embed, view=view, ephemeral=ephemeral)
+            message = await ctx.followup.send(
+                content=content,
+                files=files,
+                embed=embed,
+                view=view,
+                ephemeral=ephemeral,
+                wait=True
+            )
 
         # 1st response
         else:
-            await ctx.response.send_message( # type: ignore
+            callback = await ctx.response.send_message( # type: ignore
                 content=content,
                 files=files,
                 embed=embed,
                 view=view,
                 ephemeral=ephemeral
             )
+            message = callback.resource
 
     # --- Response to user message ---
     elif isinstance(ctx, discord.Message):
-        await ctx.channel.send(content=content, files=files, embed=embed, view=view)
+        message = await ctx.channel.send(content=content, files=files, embed=embed, view=view)
+
+    # --- Message posted by the bot on its own ---
+    elif isinstance(ctx, discord.TextChannel):
+        message = await ctx.send(content=content, files=files, embed=embed, view=view)
 
     logging.info(
         "-- Discord message has been sent: %s",
         content
     )
 
+    return message if isinstance(message, discord.Message) else None
+
 
 async def send_message_in_channel(
         ctx: discord.Member | discord.Message,
@@ -196,13 +216,93 @@ async def create_discord_embed( # pylint: disable=too-many-arguments
 #  ╚═════╝╚═╝  ╚═╝╚══════╝╚═╝  ╚═╝   ╚═╝   ╚══════╝    ╚═╝     ╚═╝╚══════╝╚══════╝
 
 
-async def create_discord_file(filename: str, data: bytes = None) -> discord.File:
+class _BufferReader(io.RawIOBase):
+    """Seekable read-only stream over a buffer, the upload copies it chunk by chunk, never whole"""
+
+    def __init__(self, buffer: bytes | bytearray | memoryview):
+        """Wrap the buffer without copying it"""
+        super().__init__()
+        self._view = memoryview(buffer).cast("B")
+        self._position = 0
+
+    def readable(self) -> bool:
+        """The stream can be read"""
+        return True
+
+    def seekable(self) -> bool:
+        """The stream can be rewound, discord.py does it before retrying an upload"""
+        return True
+
+    def readinto(self, b) -> int:
+        """Copy the next chunk of the buffer into b, return its size"""
+        size = min(len(b), len(self._view) - self._position)
+        b[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """Move the read position, return the new one"""
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}
+        self._position = max(0, base[whence] + offset)
+        return self._position
+
+    def tell(self) -> int:
+        """Return the read position"""
+        return self._position
+
+
+class TemporaryDiscordFile(discord.File):
+    """discord.File deleting its file from disk once closed, as discord.py does after uploading"""
+
+    __slots__ = ('_path', '_temp_dir')
+
+    def __init__(self, path: str, filename: str, temp_dir: str | None = None):
+        """
+        Open a temporary file for upload
+
+        Parameters:
+            path (str): Path of the file, deleted on close
+            filename (str): Filename to assign to the file
+            temp_dir (str | None): Directory holding the file, deleted with its last file
+        """
+        super().__init__(path, filename=filename)
+        self._path = path
+        self._temp_dir = temp_dir
+
+    def close(self):
+        """Close the file and delete it, closing twice is harmless"""
+        super().close()
+
+        try:
+            os.remove(self._path)
+        except FileNotFoundError:
+            pass
+
+        if self._temp_dir:
+            try:
+                os.rmdir(self._temp_dir)
+            except OSError:
+                # Other files of the directory are still waiting for their upload
+                pass
+
+
+async def create_discord_file(
+        filename: str,
+        data: bytes | bytearray | memoryview | str | os.PathLike | io.IOBase | None = None,
+        temp_dir: str | None = None
+) -> discord.File:
     """
-    Create a discord.File object from raw bytes
+    Create a discord.File object from raw bytes, a file on disk or an open file
+
+    Files are streamed from disk during the upload and buffers are read in place,
+    none of them is loaded or copied whole in memory
 
     Parameters:
-        data (bytes): Raw file data
-        filename (str): Filename to assign to the file
+        filename (str): Filename to assign to the file, or its path when data is None
+        data (bytes | bytearray | memoryview | str | os.PathLike | io.IOBase | None):
+            Raw file data, path of a file on disk or file opened in binary read mode
+        temp_dir (str | None): Temporary directory of the file at path data, the file is deleted
+                               once uploaded and the directory with its last file
 
     Returns:
         discord.File: A Discord-compatible file object
@@ -213,4 +313,16 @@ async def create_discord_file(filename: str, data: bytes = None) -> discord.File
             filename=get_string_segment(string=filename, split_char="/", i=3)
         )
 
-    return discord.File(io.BytesIO(data), filename=filename)
+    if isinstance(data, (str, os.PathLike)):
+        if temp_dir:
+            return TemporaryDiscordFile(os.fspath(data), filename=filename, temp_dir=temp_dir)
+        return discord.File(data, filename=filename)
+
+    if isinstance(data, io.IOBase):
+        return discord.File(data, filename=filename)
+
+    # BytesIO shares the memory of immutable bytes, other buffers would be copied into it
+    if isinstance(data, bytes):
+        return discord.File(io.BytesIO(data), filename=filename)
+
+    return discord.File(_BufferReader(data), filename=filename)
@@ -0,0 +1,184 @@
+"""
+bot/utils/disk_cache.py
+© by hassanpacary
+
+On-disk LRU cache of files bounded by a byte budget
+"""
+
+# --- Imports ---
+import asyncio
+import logging
+import os
+import re
+import shutil
+from collections import OrderedDict
+
+
+# ██████╗ ██╗███████╗██╗  ██╗     ██████╗ █████╗  ██████╗██╗  ██╗███████╗
+# ██╔══██╗██║██╔════╝██║ ██╔╝    ██╔════╝██╔══██╗██╔════╝██║  ██║██╔════╝
+# ██║  ██║██║███████╗█████╔╝     ██║     ███████║██║     ███████║█████╗
+# ██║  ██║██║╚════██║██╔═██╗     ██║     ██╔══██║██║     ██╔══██║██╔══╝
+# ██████╔╝██║███████║██║  ██╗    ╚██████╗██║  ██║╚██████╗██║  ██║███████╗
+# ╚═════╝ ╚═╝╚══════╝╚═╝  ╚═╝     ╚═════╝╚═╝  ╚═╝ ╚═════╝╚═╝  ╚═╝╚══════╝
+
+
+class DiskCache:
+    """Directory of cached files, the least recently used are evicted above a byte budget"""
+
+    # Every cache created is registered here, so their stats can be reported
+    registry: dict[str, "DiskCache"] = {}
+
+    def __init__(self, name: str, directory: str, max_bytes: int):
+        """
+        Initialize the cache, indexing the files already in the directory
+
+        Parameters:
+            name (str): Name of the cache, used in stats reports
+            directory (str): Directory holding the cached files, created if missing
+            max_bytes (int): Total size of the cached files before evicting the least recently used
+        """
+        self.name = name
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        # key -> size in bytes, least recently used first
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self.total_bytes = 0
+
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+        DiskCache.registry[name] = self
+
+    def _load_index(self):
+        """Index the files left by previous runs, ordered by last use (mtime)"""
+        files = []
+
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                # Partial files of an interrupted copy are dropped
+                if entry.name.endswith(".tmp"):
+                    os.remove(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name, stat.st_size))
+
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self.total_bytes += size
+
+        self._evict()
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """
+        Build a filesystem safe key from its parts
+
+        Parameters:
+            *parts: Values identifying the entry, the last one may carry the file extension
+
+        Returns:
+            str: The key, also used as filename
+        """
+        return re.sub(r"[^A-Za-z0-9._-]", "_", "_".join(str(part) for part in parts))
+
+    def __contains__(self, key: str) -> bool:
+        """Check whether a key is indexed, without counting a lookup or refreshing it"""
+        return key in self._entries
+
+    def _path(self, key: str) -> str:
+        """Return the path of a cached file"""
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> str | None:
+        """
+        Return the path of a cached file and mark it as recently used
+
+        Parameters:
+            key (str): Key of the entry, see `make_key`
+
+        Returns:
+            str | None: Path of the cached file, or None on a miss
+        """
+        path = self._path(key)
+
+        if key not in self._entries or not os.path.exists(path):
+            self._forget(key)
+            self.counters['misses'] += 1
+            return None
+
+        # The mtime keeps the LRU order across restarts
+        self._entries.move_to_end(key)
+        os.utime(path)
+
+        self.counters['hits'] += 1
+        return path
+
+    def _forget(self, key: str):
+        """Drop an entry from the index"""
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self.total_bytes -= size
+
+    def _evict(self):
+        """Remove the least recently used files until the cache fits its byte budget"""
+        while self.total_bytes > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._forget(key)
+
+            # An open file, such as one being uploaded, stays readable on POSIX
+            try:
+                os.remove(self._path(key))
+            except OSError as e:
+                logging.warning("Failed to evict %s from cache %s.\n%s", key, self.name, e)
+
+            self.counters['evictions'] += 1
+
+    async def put(self, key: str, source_path: str) -> str | None:
+        """
+        Copy a file into the cache, evicting the least recently used files if needed
+
+        Parameters:
+            key (str): Key of the entry, see `make_key`
+            source_path (str): Path of the file to cache
+
+        Returns:
+            str | None: Path of the cached copy, or None if it can't be cached
+        """
+        path = self._path(key)
+        size = os.path.getsize(source_path)
+
+        if size > self.max_bytes:
+            return None
+
+        # Copy to a temporary name first, a crash never leaves a truncated entry
+        try:
+            await asyncio.to_thread(shutil.copyfile, source_path, path + ".tmp")
+            os.replace(path + ".tmp", path)
+
+        except OSError as e:
+            logging.warning("Failed to cache %s in %s.\n%s", key, self.name, e)
+            return None
+
+        self._forget(key)
+        self._entries[key] = size
+        self.total_bytes += size
+        self._evict()
+
+        return path if key in self._entries else None
+
+    def stats(self) -> dict:
+        """Return a JSON serializable view of the cache statistics"""
+        lookups = self.counters['hits'] + self.counters['misses']
+
+        return {
+            "files": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.counters['hits'],
+            "misses": self.counters['misses'],
+            "hit_ratio": round(self.counters['hits'] / lookups, 3) if lookups else None,
+            "evictions": self.counters['evictions']
+        }
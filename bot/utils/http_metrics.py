@@ -0,0 +1,290 @@
+"""
+bot/utils/http_metrics.py
+© by hassanpacary
+
+Per-host latency and throughput metrics for outbound HTTP requests
+"""
+
+# --- Imports ---
+import json
+import time
+from types import SimpleNamespace
+
+# --- Third party imports ---
+import aiohttp
+
+
+# ██╗  ██╗██╗███████╗████████╗ ██████╗  ██████╗ ██████╗  █████╗ ███╗   ███╗
+# ██║  ██║██║██╔════╝╚══██╔══╝██╔═══██╗██╔════╝ ██╔══██╗██╔══██╗████╗ ████║
+# ███████║██║███████╗   ██║   ██║   ██║██║  ███╗██████╔╝███████║██╔████╔██║
+# ██╔══██║██║╚════██║   ██║   ██║   ██║██║   ██║██╔══██╗██╔══██║██║╚██╔╝██║
+# ██║  ██║██║███████║   ██║   ╚██████╔╝╚██████╔╝██║  ██║██║  ██║██║ ╚═╝ ██║
+# ╚═╝  ╚═╝╚═╝╚══════╝   ╚═╝    ╚═════╝  ╚═════╝ ╚═╝  ╚═╝╚═╝  ╚═╝╚═╝     ╚═╝
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram with fixed buckets, in seconds"""
+
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+        """Initialize an empty histogram"""
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """
+        Record one observation
+
+        Parameters:
+            value (float): Observed latency in seconds
+        """
+        index = len(self.BUCKETS)
+        for i, bound in enumerate(self.BUCKETS):
+            if value <= bound:
+                index = i
+                break
+
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float | None:
+        """
+        Estimate a percentile from the buckets
+
+        Parameters:
+            q (float): Percentile between 0 and 1
+
+        Returns:
+            float | None: Upper bound of the bucket containing the percentile,
+                          or None if nothing has been observed
+        """
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.BUCKETS[i], self.max) if i < len(self.BUCKETS) else self.max
+
+        return self.max
+
+    def snapshot(self) -> dict:
+        """Return a JSON serializable view of the histogram"""
+        buckets = {f"le_{bound}": count for bound, count in zip(self.BUCKETS, self.counts)}
+        buckets["le_inf"] = self.counts[-1]
+
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4) if self.count else None,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "max": round(self.max, 4),
+            "buckets": buckets
+        }
+
+
+# ██╗  ██╗████████╗████████╗██████╗     ███╗   ███╗███████╗████████╗██████╗ ██╗ ██████╗███████╗
+# ██║  ██║╚══██╔══╝╚══██╔══╝██╔══██╗    ████╗ ████║██╔════╝╚══██╔══╝██╔══██╗██║██╔════╝██╔════╝
+# ███████║   ██║      ██║   ██████╔╝    ██╔████╔██║█████╗     ██║   ██████╔╝██║██║     ███████╗
+# ██╔══██║   ██║      ██║   ██╔═══╝     ██║╚██╔╝██║██╔══╝     ██║   ██╔══██╗██║██║     ╚════██║
+# ██║  ██║   ██║      ██║   ██║         ██║ ╚═╝ ██║███████╗   ██║   ██║  ██║██║╚██████╗███████║
+# ╚═╝  ╚═╝   ╚═╝      ╚═╝   ╚═╝         ╚═╝     ╚═╝╚══════╝   ╚═╝   ╚═╝  ╚═╝╚═╝ ╚═════╝╚══════╝
+
+
+class HttpMetrics:
+    """Collect per-host and per-pool metrics from aiohttp trace signals"""
+
+    def __init__(self):
+        """Initialize empty metrics"""
+        self.started_at = time.time()
+        self.hosts: dict[str, dict] = {}
+        self.pools: dict[str, dict] = {}
+
+    def _host(self, host: str) -> dict:
+        """Return the metrics of a host, creating them on first use"""
+        if host not in self.hosts:
+            self.hosts[host] = {
+                "requests": 0,
+                "status": {"2xx": 0, "3xx": 0, "4xx": 0, "5xx": 0, "errors": 0},
+                "bytes_sent": 0,
+                "bytes_received": 0,
+                "ttfb": LatencyHistogram(),
+                "latency": LatencyHistogram()
+            }
+
+        return self.hosts[host]
+
+    def _pool(self, pool: str) -> dict:
+        """Return the metrics of a connection pool, creating them on first use"""
+        if pool not in self.pools:
+            self.pools[pool] = {
+                "limit": 0,
+                "in_flight": 0,
+                "peak_in_flight": 0,
+                "queued": 0,
+                "peak_queued": 0,
+                "queued_total": 0,
+                "connections_created": 0,
+                "connections_reused": 0,
+                "queue_wait": LatencyHistogram()
+            }
+
+        return self.pools[pool]
+
+    # ████████╗██████╗  █████╗  ██████╗██╗███╗   ██╗ ██████╗
+    # ╚══██╔══╝██╔══██╗██╔══██╗██╔════╝██║████╗  ██║██╔════╝
+    #    ██║   ██████╔╝███████║██║     ██║██╔██╗ ██║██║  ███╗
+    #    ██║   ██╔══██╗██╔══██║██║     ██║██║╚██╗██║██║   ██║
+    #    ██║   ██║  ██║██║  ██║╚██████╗██║██║ ╚████║╚██████╔╝
+    #    ╚═╝   ╚═╝  ╚═╝╚═╝  ╚═╝ ╚═════╝╚═╝╚═╝  ╚═══╝ ╚═════╝
+
+    def trace_config(self, pool: str) -> aiohttp.TraceConfig:
+        """
+        Build an aiohttp.TraceConfig feeding this collector
+
+        Parameters:
+            pool (str): Name of the connection pool (one per aiohttp.ClientSession)
+
+        Returns:
+            aiohttp.TraceConfig: Trace config to pass to aiohttp.ClientSession(trace_configs=...)
+        """
+        trace_config = aiohttp.TraceConfig(
+            trace_config_ctx_factory=lambda trace_request_ctx: SimpleNamespace(
+                start=None,
+                queued_at=None
+            )
+        )
+
+        async def on_request_start(session, ctx, _params):
+            ctx.start = time.perf_counter()
+
+            pool_metrics = self._pool(pool)
+            pool_metrics["limit"] = getattr(session.connector, "limit", 0)
+            pool_metrics["in_flight"] += 1
+            pool_metrics["peak_in_flight"] = max(
+                pool_metrics["peak_in_flight"],
+                pool_metrics["in_flight"]
+            )
+
+        async def on_request_chunk_sent(_session, _ctx, params):
+            self._host(params.url.host)["bytes_sent"] += len(params.chunk)
+
+        async def on_request_end(_session, ctx, params):
+            self._pool(pool)["in_flight"] -= 1
+
+            host_metrics = self._host(params.url.host)
+            status_class = f"{params.response.status // 100}xx"
+            host_metrics["requests"] += 1
+            host_metrics["status"][status_class] = host_metrics["status"].get(status_class, 0) + 1
+            host_metrics["ttfb"].observe(time.perf_counter() - ctx.start)
+
+            # The body is read later by the caller, total latency is known once it hits EOF
+            content = params.response.content
+
+            def on_eof():
+                host_metrics["latency"].observe(time.perf_counter() - ctx.start)
+                host_metrics["bytes_received"] += getattr(content, "total_bytes", 0)
+
+            content.on_eof(on_eof)
+
+        async def on_request_exception(_session, _ctx, params):
+            self._pool(pool)["in_flight"] -= 1
+
+            host_metrics = self._host(params.url.host)
+            host_metrics["requests"] += 1
+            host_metrics["status"]["errors"] += 1
+
+        async def on_connection_queued_start(_session, ctx, _params):
+            ctx.queued_at = time.perf_counter()
+
+            pool_metrics = self._pool(pool)
+            pool_metrics["queued"] += 1
+            pool_metrics["queued_total"] += 1
+            pool_metrics["peak_queued"] = max(pool_metrics["peak_queued"], pool_metrics["queued"])
+
+        async def on_connection_queued_end(_session, ctx, _params):
+            pool_metrics = self._pool(pool)
+            pool_metrics["queued"] -= 1
+            pool_metrics["queue_wait"].observe(time.perf_counter() - ctx.queued_at)
+
+        async def on_connection_create_end(_session, _ctx, _params):
+            self._pool(pool)["connections_created"] += 1
+
+        async def on_connection_reuseconn(_session, _ctx, _params):
+            self._pool(pool)["connections_reused"] += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_chunk_sent.append(on_request_chunk_sent)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+
+        return trace_config
+
+    # ███████╗███╗   ██╗ █████╗ ██████╗ ███████╗██╗  ██╗ ██████╗ ████████╗
+    # ██╔════╝████╗  ██║██╔══██╗██╔══██╗██╔════╝██║  ██║██╔═══██╗╚══██╔══╝
+    # ███████╗██╔██╗ ██║███████║██████╔╝███████╗███████║██║   ██║   ██║
+    # ╚════██║██║╚██╗██║██╔══██║██╔═══╝ ╚════██║██╔══██║██║   ██║   ██║
+    # ███████║██║ ╚████║██║  ██║██║     ███████║██║  ██║╚██████╔╝   ██║
+    # ╚══════╝╚═╝  ╚═══╝╚═╝  ╚═╝╚═╝     ╚══════╝╚═╝  ╚═╝ ╚═════╝    ╚═╝
+
+    def snapshot(self, host: str | None = None) -> dict:
+        """
+        Return a JSON serializable view of the collected metrics
+
+        Parameters:
+            host (str | None): Only keep hosts containing this string
+
+        Returns:
+            dict: Uptime, per-host metrics and per-pool metrics
+        """
+        hosts = {}
+        for name, metrics in sorted(self.hosts.items()):
+            if host and host not in name:
+                continue
+
+            hosts[name] = {
+                **metrics,
+                "status": dict(metrics["status"]),
+                "ttfb": metrics["ttfb"].snapshot(),
+                "latency": metrics["latency"].snapshot()
+            }
+
+        pools = {}
+        for name, metrics in sorted(self.pools.items()):
+            pools[name] = {
+                **metrics,
+                "saturation": round(metrics["peak_in_flight"] / metrics["limit"], 3)
+                if metrics["limit"] else None,
+                "queue_wait": metrics["queue_wait"].snapshot()
+            }
+
+        return {
+            "uptime": round(time.time() - self.started_at),
+            "hosts": hosts,
+            "pools": pools
+        }
+
+    def to_json(self, host: str | None = None) -> str:
+        """Dump the metrics snapshot as an indented JSON string"""
+        return json.dumps(self.snapshot(host=host), indent=2)
+
+    def reset(self):
+        """Drop all collected metrics"""
+        self.started_at = time.time()
+        self.hosts.clear()
+        self.pools.clear()
+
+
+# --- Singleton instance for global usage ---
+http_metrics = HttpMetrics()
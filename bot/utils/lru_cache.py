@@ -0,0 +1,121 @@
+"""
+bot/utils/lru_cache.py
+© by hassanpacary
+
+Bounded in-memory LRU cache with time to live and statistics
+"""
+
+# --- Imports ---
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+# ██╗     ██████╗ ██╗   ██╗     ██████╗ █████╗  ██████╗██╗  ██╗███████╗
+# ██║     ██╔══██╗██║   ██║    ██╔════╝██╔══██╗██╔════╝██║  ██║██╔════╝
+# ██║     ██████╔╝██║   ██║    ██║     ███████║██║     ███████║█████╗
+# ██║     ██╔══██╗██║   ██║    ██║     ██╔══██║██║     ██╔══██║██╔══╝
+# ███████╗██║  ██║╚██████╔╝    ╚██████╗██║  ██║╚██████╗██║  ██║███████╗
+# ╚══════╝╚═╝  ╚═╝ ╚═════╝      ╚═════╝╚═╝  ╚═╝ ╚═════╝╚═╝  ╚═╝╚══════╝
+
+
+class LruCache:
+    """Bounded LRU cache whose entries expire after a time to live"""
+
+    # Every cache created is registered here, so their stats can be reported
+    registry: dict[str, "LruCache"] = {}
+
+    def __init__(self, name: str, max_size: int, ttl: float | None = None):
+        """
+        Initialize an empty cache and register it
+
+        Parameters:
+            name (str): Name of the cache, used in stats reports
+            max_size (int): Maximum number of entries before evicting the least recently used
+            ttl (float | None): Default time to live of an entry in seconds, None for no expiry
+        """
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+        LruCache.registry[name] = self
+
+    def __len__(self) -> int:
+        """Return the number of entries, expired ones included"""
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return a cached value and mark it as recently used
+
+        Parameters:
+            key (Hashable): Key of the entry
+            default (Any): Value returned on a miss
+
+        Returns:
+            Any: The cached value, or default if missing or expired
+        """
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.counters['misses'] += 1
+            return default
+
+        value, expires_at = entry
+
+        # --- Entry expired ---
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            self.counters['expirations'] += 1
+            self.counters['misses'] += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.counters['hits'] += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        """
+        Store a value, evicting the least recently used entries if the cache is full
+
+        Parameters:
+            key (Hashable): Key of the entry
+            value (Any): Value to cache
+            ttl (float | None): Time to live of this entry, defaults to the cache ttl
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value, or default if missing"""
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        """Drop every entry, stats are kept"""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return a JSON serializable view of the cache statistics"""
+        lookups = self.counters['hits'] + self.counters['misses']
+
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.counters['hits'],
+            "misses": self.counters['misses'],
+            "hit_ratio": round(self.counters['hits'] / lookups, 3) if lookups else None,
+            "evictions": self.counters['evictions'],
+            "expirations": self.counters['expirations']
+        }
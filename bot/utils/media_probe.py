@@ -0,0 +1,201 @@
+"""
+bot/utils/media_probe.py
+© by hassanpacary
+
+Asynchronous ffprobe wrapper returning media metadata, cached by file content
+"""
+
+# --- Imports ---
+import asyncio
+import hashlib
+import json
+import logging
+
+# --- Bot modules ---
+from bot.core.config_loader import BOT
+from bot.utils.lru_cache import LruCache
+
+
+# --- Probes are keyed by file hash, a same file is only probed once ---
+probe_cache = LruCache(
+    name="media_probe",
+    max_size=BOT['media']['probe_cache_size']
+)
+
+
+# ██╗  ██╗ █████╗ ███████╗██╗  ██╗
+# ██║  ██║██╔══██╗██╔════╝██║  ██║
+# ███████║███████║███████╗███████║
+# ██╔══██║██╔══██║╚════██║██╔══██║
+# ██║  ██║██║  ██║███████║██║  ██║
+# ╚═╝  ╚═╝╚═╝  ╚═╝╚══════╝╚═╝  ╚═╝
+
+
+def _hash_file_sync(file_path: str) -> str:
+    """
+    Compute the hash of a file content, reading it by chunks
+
+    Parameters:
+        file_path (str): Path to the file
+
+    Returns:
+        str: Hex digest of the file content
+    """
+    digest = hashlib.blake2b(digest_size=16)
+
+    with open(file_path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+async def hash_file(file_path: str) -> str:
+    """Compute the hash of a file content without blocking the event loop"""
+    return await asyncio.to_thread(_hash_file_sync, file_path)
+
+
+# ██████╗ ██████╗  ██████╗ ██████╗ ███████╗
+# ██╔══██╗██╔══██╗██╔═══██╗██╔══██╗██╔════╝
+# ██████╔╝██████╔╝██║   ██║██████╔╝█████╗
+# ██╔═══╝ ██╔══██╗██║   ██║██╔══██╗██╔══╝
+# ██║     ██║  ██║╚██████╔╝██████╔╝███████╗
+# ╚═╝     ╚═╝  ╚═╝ ╚═════╝ ╚═════╝ ╚══════╝
+
+
+def _to_float(value) -> float | None:
+    """Convert an ffprobe numeric field to float, None if missing or invalid"""
+    try:
+        return float(value)
+
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value) -> int | None:
+    """Convert an ffprobe numeric field to int, None if missing or invalid"""
+    value = _to_float(value)
+    return None if value is None else int(value)
+
+
+def _parse_frame_rate(value: str | None) -> float | None:
+    """Convert an ffprobe frame rate such as '30000/1001' to frames per second"""
+    if not value or "/" not in value:
+        return _to_float(value)
+
+    numerator, denominator = value.split("/", 1)
+    numerator, denominator = _to_float(numerator), _to_float(denominator)
+
+    if not numerator or not denominator:
+        return None
+
+    return round(numerator / denominator, 3)
+
+
+def _parse_probe(data: dict) -> dict:
+    """
+    Extract the useful fields of a raw ffprobe JSON output
+
+    Parameters:
+        data (dict): Output of ffprobe -show_format -show_streams
+
+    Returns:
+        dict: Duration, size, bitrate, container and first video/audio streams info
+    """
+    fmt = data.get("format", {})
+    streams = data.get("streams", [])
+
+    video_stream = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio_stream = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+    video = None
+    if video_stream:
+        video = {
+            "codec": video_stream.get("codec_name"),
+            "width": video_stream.get("width"),
+            "height": video_stream.get("height"),
+            "fps": _parse_frame_rate(video_stream.get("avg_frame_rate"))
+            or _parse_frame_rate(video_stream.get("r_frame_rate")),
+            "bit_rate": _to_int(video_stream.get("bit_rate")),
+            "duration": _to_float(video_stream.get("duration"))
+        }
+
+    audio = None
+    if audio_stream:
+        audio = {
+            "codec": audio_stream.get("codec_name"),
+            "bit_rate": _to_int(audio_stream.get("bit_rate")),
+            "sample_rate": _to_int(audio_stream.get("sample_rate")),
+            "channels": audio_stream.get("channels"),
+            "duration": _to_float(audio_stream.get("duration"))
+        }
+
+    # Some containers only carry the duration at the stream level
+    duration = (
+        _to_float(fmt.get("duration"))
+        or (video or {}).get("duration")
+        or (audio or {}).get("duration")
+    )
+
+    return {
+        "format": fmt.get("format_name"),
+        "duration": duration,
+        "size": _to_int(fmt.get("size")),
+        "bit_rate": _to_int(fmt.get("bit_rate")),
+        "video": video,
+        "audio": audio,
+        "has_audio": audio is not None
+    }
+
+
+async def probe_media(file_path: str) -> dict:
+    """
+    Run ffprobe on a media file without blocking the event loop
+
+    Results are cached by file hash, so every feature probing the same
+    file shares a single ffprobe run
+
+    Parameters:
+        file_path (str): Path to the media file
+
+    Returns:
+        dict: Media metadata, see `_parse_probe`
+    """
+    file_hash = await hash_file(file_path)
+
+    cached = probe_cache.get(file_hash)
+    if cached is not None:
+        return cached
+
+    process = await asyncio.create_subprocess_exec(
+        "ffprobe",
+        "-v", "error",
+        "-print_format", "json",
+        "-show_format",
+        "-show_streams",
+        file_path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+
+    if process.returncode != 0:
+        raise RuntimeError(f'FFprobe error: {stderr.decode()}')
+
+    try:
+        probe = _parse_probe(json.loads(stdout))
+
+    except ValueError as e:
+        raise RuntimeError(f"Failed to parse ffprobe output: {stdout[:200]}") from e
+
+    logging.info(
+        "-- Probed %s: %s, %ss, video=%s, audio=%s",
+        file_path,
+        probe['format'],
+        probe['duration'],
+        (probe['video'] or {}).get("codec"),
+        (probe['audio'] or {}).get("codec")
+    )
+
+    probe_cache.set(file_hash, probe)
+    return probe
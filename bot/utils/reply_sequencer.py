@@ -0,0 +1,66 @@
+"""
+bot/utils/reply_sequencer.py
+© by hassanpacary
+
+Ordering of replies prepared concurrently, so they are sent in the order of their requests
+"""
+
+# --- Imports ---
+import asyncio
+from typing import Awaitable, Callable
+
+
+# Coroutine a reply awaits before sending its first message
+TurnCallback = Callable[[], Awaitable[None]]
+
+
+# pylint: disable=line-too-long
+# ██████╗ ███████╗██████╗ ██╗  ██╗   ██╗    ███████╗███████╗ ██████╗ ██╗   ██╗███████╗███╗   ██╗ ██████╗███████╗██████╗
+# ██╔══██╗██╔════╝██╔══██╗██║  ╚██╗ ██╔╝    ██╔════╝██╔════╝██╔═══██╗██║   ██║██╔════╝████╗  ██║██╔════╝██╔════╝██╔══██╗
+# ██████╔╝█████╗  ██████╔╝██║   ╚████╔╝     ███████╗█████╗  ██║   ██║██║   ██║█████╗  ██╔██╗ ██║██║     █████╗  ██████╔╝
+# ██╔══██╗██╔══╝  ██╔═══╝ ██║    ╚██╔╝      ╚════██║██╔══╝  ██║▄▄ ██║██║   ██║██╔══╝  ██║╚██╗██║██║     ██╔══╝  ██╔══██╗
+# ██║  ██║███████╗██║     ███████╗██║       ███████║███████╗╚██████╔╝╚██████╔╝███████╗██║ ╚████║╚██████╗███████╗██║  ██║
+# ╚═╝  ╚═╝╚══════╝╚═╝     ╚══════╝╚═╝       ╚══════╝╚══════╝ ╚══▀▀═╝  ╚═════╝ ╚══════╝╚═╝  ╚═══╝ ╚═════╝╚══════╝╚═╝  ╚═╝
+# pylint: enable=line-too-long
+
+
+class ReplySequencer:
+    """Lets replies numbered 0..N-1 be prepared in any order but sent in ascending order"""
+
+    def __init__(self):
+        """Initialize the sequencer, reply 0 may send right away"""
+        self._condition = asyncio.Condition()
+        self._next = 0
+        self._done: set[int] = set()
+
+    def turn(self, index: int) -> TurnCallback:
+        """
+        Build the callback a reply awaits before sending
+
+        Parameters:
+            index (int): Position of the reply
+
+        Returns:
+            TurnCallback: Coroutine function returning once every previous reply is finished
+        """
+        async def wait_turn():
+            async with self._condition:
+                await self._condition.wait_for(lambda: self._next >= index)
+
+        return wait_turn
+
+    async def finish(self, index: int):
+        """
+        Mark a reply as finished, sent or failed, letting the following ones send
+
+        Parameters:
+            index (int): Position of the reply
+        """
+        async with self._condition:
+            self._done.add(index)
+
+            while self._next in self._done:
+                self._done.discard(self._next)
+                self._next += 1
+
+            self._condition.notify_all()
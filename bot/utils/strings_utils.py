@@ -32,19 +32,35 @@ def matches_pattern(pattern: str, text: str, ) -> bool:
     return bool(re.match(pattern, text))
 
 
-def regex_search(pattern: str, text: str) -> str | None:
+def regex_search(pattern: str, text: str, group: int = 0) -> str | None:
     """
     Search for a regex pattern in a string and return the matched text
 
     Parameters:
         pattern (str): Regex pattern as a string
         text (str): Text to search in
+        group (int): Index of the group to return (default 0, the whole match)
 
     Returns:
         str | None: The matched string, or None if no match is found
     """
     match = re.search(pattern, text)
-    return match.group(0) if match else None
+    return match.group(group) if match else None
+
+
+def regex_findall(pattern: str, text: str, group: int = 0) -> list[str]:
+    """
+    Search for every match of a regex pattern in a string
+
+    Parameters:
+        pattern (str): Regex pattern as a string
+        text (str): Text to search in
+        group (int): Index of the group to return (default 0, the whole match)
+
+    Returns:
+        list[str]: The matched strings, in order of appearance
+    """
+    return [match.group(group) for match in re.finditer(pattern, text)]
 
 
 #  ██████╗██╗     ███████╗ █████╗ ███╗   ██╗